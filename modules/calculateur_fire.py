@@ -4,6 +4,364 @@ import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 from utils.helpers import format_nombre
+from utils.historique import (
+    charger_rendements_historiques,
+    fenetres_glissantes,
+    lister_fichiers_rendements,
+    regrouper_periodes,
+)
+from utils.simulation import generer_log_rendements, trajectoires_patrimoine
+
+
+def annees_avant_fire(patrimoine_actuel, epargne_annuelle, nombre_fire, rendement):
+    """
+    Nombre d'années avant d'atteindre le nombre FIRE (vectorisé)
+
+    patrimoine_actuel, epargne_annuelle, nombre_fire : montants en € (scalaires ou tableaux)
+    rendement : rendement annuel (ex: 0.07 pour 7%)
+
+    Épargne versée en fin d'année. Les cas limites sont traités par masques :
+    0 si l'objectif est déjà atteint, formule linéaire à rendement nul, inf si
+    le patrimoine ne peut plus croître (intérêts + épargne ≤ 0).
+    """
+    P, E, F, r = np.broadcast_arrays(
+        *(
+            np.asarray(x, dtype=float)
+            for x in (patrimoine_actuel, epargne_annuelle, nombre_fire, rendement)
+        )
+    )
+    deja_atteint = P >= F
+    impossible = ~deja_atteint & (P * r + E <= 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annees = np.where(
+            r == 0,
+            (F - P) / E,
+            np.log((F * r + E) / (P * r + E)) / np.log1p(r),
+        )
+    annees = np.where(deja_atteint, 0.0, np.where(impossible, np.inf, annees))
+    return annees[()]
+
+
+def _indice_croissance(taux, n_annees):
+    """Indice cumulé (année 0 = 1) d'un taux annuel scalaire ou par année"""
+    taux = np.broadcast_to(np.asarray(taux, dtype=float), (n_annees,))
+    return np.concatenate(([1.0], np.cumprod(1 + taux)))
+
+
+def projeter_flux_patrimoine(
+    patrimoine_actuel,
+    revenus_annuels,
+    depenses_annuelles,
+    rendement,
+    n_annees,
+    croissance_revenus=0.0,
+    inflation_depenses=0.0,
+    evenements=(),
+    pension_annuelle=0.0,
+    annee_pension=None,
+):
+    """
+    Projection annuelle du patrimoine avec des flux variables dans le temps
+
+    patrimoine_actuel, revenus_annuels, depenses_annuelles : niveaux actuels (€)
+    rendement, croissance_revenus, inflation_depenses : taux annuels, scalaires ou
+    tableaux de n_annees valeurs (ex: 0.02 pour 2%)
+    evenements : couples (année, montant) ponctuels, montant négatif pour une dépense
+    pension_annuelle : pension en € d'aujourd'hui, indexée comme les dépenses
+    annee_pension : première année de versement de la pension (None = jamais)
+
+    Les flux de l'année k sont placés en fin d'année. Indices de croissance par
+    produits cumulés, patrimoine par sommes cumulées actualisées : aucune boucle.
+    Renvoie un dict de tableaux de n_annees + 1 valeurs (année 0 = aujourd'hui).
+    """
+    annees = np.arange(n_annees + 1)
+    indice_depenses = _indice_croissance(inflation_depenses, n_annees)
+
+    revenus = revenus_annuels * _indice_croissance(croissance_revenus, n_annees)
+    depenses = depenses_annuelles * indice_depenses
+    pension = np.zeros(n_annees + 1)
+    if annee_pension is not None:
+        pension = np.where(
+            annees >= annee_pension, pension_annuelle * indice_depenses, 0.0
+        )
+
+    ponctuels = np.zeros(n_annees + 1)
+    if len(evenements):
+        annees_evenements, montants = np.asarray(evenements, dtype=float).T
+        dans_horizon = (annees_evenements >= 1) & (annees_evenements <= n_annees)
+        np.add.at(
+            ponctuels,
+            annees_evenements[dans_horizon].astype(int),
+            montants[dans_horizon],
+        )
+
+    flux_net = revenus + pension - depenses + ponctuels
+    log_rendements = np.log1p(
+        np.broadcast_to(np.asarray(rendement, dtype=float), (n_annees,))
+    )
+    patrimoine = trajectoires_patrimoine(
+        log_rendements[None, :], patrimoine_actuel, flux_net[1:]
+    )[0]
+
+    return {
+        "Années": annees,
+        "Revenus": revenus,
+        "Dépenses": depenses,
+        "Pension": pension,
+        "Événements": ponctuels,
+        "Flux net": flux_net,
+        "Patrimoine": patrimoine,
+    }
+
+
+def simuler_fire_monte_carlo(
+    patrimoine_actuel,
+    epargne_annuelle,
+    depenses_annuelles,
+    taux_retrait,
+    rendement_moyen,
+    volatilite,
+    duree_retraite=50,
+    horizon_max=60,
+    n_chemins=10_000,
+    graine=None,
+):
+    """
+    Simulation Monte Carlo du parcours FIRE : accumulation puis décumulation
+
+    patrimoine_actuel : patrimoine de départ (€)
+    epargne_annuelle : épargne versée en fin d'année pendant l'accumulation (€)
+    depenses_annuelles : dépenses retirées en début d'année une fois FIRE atteint (€)
+    taux_retrait : taux de retrait en % (définit le nombre FIRE)
+    rendement_moyen, volatilite : paramètres annuels des rendements (ex: 0.07, 0.15)
+    duree_retraite : nombre d'années de retraits après l'atteinte de FIRE
+    horizon_max : nombre maximal d'années d'accumulation simulées
+
+    Chaque chemin atteint FIRE à sa propre date ; la décumulation est évaluée sur les
+    rendements qui suivent cette date, pour tous les chemins à la fois.
+    Renvoie un dict de tableaux (un élément par chemin) : "Années FIRE" (inf si
+    non atteint), "Patrimoine FIRE", "Patrimoine final" et "Succès".
+    """
+    nombre_fire = depenses_annuelles * (100 / taux_retrait)
+    decalages = np.arange(duree_retraite)
+    resultats = {
+        "Années FIRE": [],
+        "Patrimoine FIRE": [],
+        "Patrimoine final": [],
+        "Succès": [],
+    }
+
+    for log_rendements in generer_log_rendements(
+        n_chemins,
+        horizon_max + duree_retraite,
+        rendement_moyen,
+        volatilite,
+        periodes_par_an=1,
+        graine=graine,
+    ):
+        lignes = np.arange(log_rendements.shape[0])
+
+        # Accumulation : première année où le nombre FIRE est atteint
+        accumulation = trajectoires_patrimoine(
+            log_rendements[:, :horizon_max], patrimoine_actuel, epargne_annuelle
+        )
+        atteint = accumulation >= nombre_fire
+        fire_atteint = atteint.any(axis=1)
+        annees_fire = atteint.argmax(axis=1)
+        patrimoine_fire = accumulation[lignes, annees_fire]
+
+        # Décumulation : retraits en début d'année sur les rendements suivants
+        rendements_retraite = log_rendements[
+            lignes[:, None], annees_fire[:, None] + decalages
+        ]
+        decumulation = trajectoires_patrimoine(
+            rendements_retraite,
+            patrimoine_fire[:, None],
+            -depenses_annuelles,
+            debut_periode=True,
+        )
+        patrimoine_final = decumulation[:, -1]
+
+        resultats["Années FIRE"].append(np.where(fire_atteint, annees_fire, np.inf))
+        resultats["Patrimoine FIRE"].append(patrimoine_fire)
+        resultats["Patrimoine final"].append(patrimoine_final)
+        resultats["Succès"].append(fire_atteint & (patrimoine_final > 0))
+
+    return {cle: np.concatenate(valeurs) for cle, valeurs in resultats.items()}
+
+
+def taux_retrait_historiques(log_rendements_annuels, duree_retraite):
+    """
+    Taux de retrait maximal soutenable pour chaque cohorte historique
+
+    log_rendements_annuels : série historique de log-rendements annuels
+    duree_retraite : durée de chaque cohorte (années)
+
+    Retrait constant w en début d'année : le capital d'une cohorte vaut à la fin
+    e^(L_N) * (W0 - w * Σ e^(-L_j)), donc le taux maximal est exactement
+    1 / Σ_{j<N} e^(-L_j). Les cohortes sont une vue glissante (sans copie) de la
+    série. Renvoie un tableau avec un taux par année de départ.
+    """
+    cohortes = fenetres_glissantes(log_rendements_annuels, duree_retraite)
+    return _taux_soutenables(cohortes)
+
+
+def _taux_soutenables(log_rendements):
+    """Taux de retrait constant maximal de chaque ligne d'un tableau (chemins, années)"""
+    cumul = np.cumsum(log_rendements[:, :-1], axis=1)
+    return 1 / (1 + np.exp(-cumul).sum(axis=1))
+
+
+def _retrait_montant_constant(
+    patrimoine, retrait_precedent, retrait_initial, taux_initial
+):
+    """Retrait initial maintenu chaque année (règle des 4 % classique)"""
+    return np.full_like(patrimoine, retrait_initial)
+
+
+def _retrait_pourcentage_constant(
+    patrimoine, retrait_precedent, retrait_initial, taux_initial
+):
+    """Retrait égal au taux initial appliqué au patrimoine courant"""
+    return taux_initial * patrimoine
+
+
+def _retrait_guyton_klinger(
+    patrimoine,
+    retrait_precedent,
+    retrait_initial,
+    taux_initial,
+    garde_fou=0.20,
+    ajustement=0.10,
+):
+    """
+    Garde-fous de Guyton-Klinger : le retrait est réduit (ou augmenté) de
+    `ajustement` dès que le taux de retrait courant dépasse de plus de `garde_fou`
+    le taux initial (ou passe en dessous)
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taux_courant = retrait_precedent / patrimoine
+    facteur = np.where(
+        taux_courant > taux_initial * (1 + garde_fou),
+        1 - ajustement,
+        np.where(taux_courant < taux_initial * (1 - garde_fou), 1 + ajustement, 1.0),
+    )
+    return retrait_precedent * facteur
+
+
+def _retrait_plancher_plafond(
+    patrimoine,
+    retrait_precedent,
+    retrait_initial,
+    taux_initial,
+    plancher=0.85,
+    plafond=1.25,
+):
+    """Pourcentage constant borné entre plancher et plafond du retrait initial"""
+    return np.clip(
+        taux_initial * patrimoine,
+        plancher * retrait_initial,
+        plafond * retrait_initial,
+    )
+
+
+STRATEGIES_RETRAIT = {
+    "Montant constant": _retrait_montant_constant,
+    "Pourcentage constant": _retrait_pourcentage_constant,
+    "Garde-fous Guyton-Klinger": _retrait_guyton_klinger,
+    "Plancher / plafond": _retrait_plancher_plafond,
+}
+
+
+def simuler_retraits(
+    log_rendements, patrimoine_initial, retrait_initial, strategie, **parametres
+):
+    """
+    Décumulation d'un lot de chemins selon une règle de retrait
+
+    log_rendements : tableau (chemins, années) de log-rendements annuels
+    patrimoine_initial : capital au début de la retraite (€)
+    retrait_initial : retrait de la première année (€)
+    strategie : clé de STRATEGIES_RETRAIT
+    parametres : paramètres propres à la règle (garde_fou, plancher, ...)
+
+    Le retrait est prélevé en début d'année, plafonné au patrimoine disponible.
+    Une seule boucle sur les années, chaque étape traitant tous les chemins.
+    Renvoie un dict : "Patrimoine" (chemins, années + 1), "Retraits" (chemins,
+    années) et "Succès" (capital jamais épuisé).
+    """
+    regle = STRATEGIES_RETRAIT[strategie]
+    n_chemins, n_annees = log_rendements.shape
+    # Sans capital de départ, aucun taux initial n'a de sens : retraits nuls
+    taux_initial = (
+        retrait_initial / patrimoine_initial if patrimoine_initial > 0 else 0.0
+    )
+    croissance = np.exp(log_rendements)
+
+    patrimoine = np.empty((n_chemins, n_annees + 1))
+    patrimoine[:, 0] = patrimoine_initial
+    retraits = np.empty((n_chemins, n_annees))
+    retrait = np.full(n_chemins, float(retrait_initial))
+
+    for annee in range(n_annees):
+        if annee > 0:
+            retrait = regle(
+                patrimoine[:, annee],
+                retrait,
+                retrait_initial,
+                taux_initial,
+                **parametres,
+            )
+        retraits[:, annee] = np.minimum(retrait, patrimoine[:, annee])
+        patrimoine[:, annee + 1] = (
+            patrimoine[:, annee] - retraits[:, annee]
+        ) * croissance[:, annee]
+
+    return {
+        "Patrimoine": patrimoine,
+        "Retraits": retraits,
+        "Succès": patrimoine[:, -1] > 0,
+    }
+
+
+def resoudre_taux_retrait(
+    log_rendements,
+    probabilite_cible,
+    strategie="Montant constant",
+    taux_max=0.20,
+    tolerance=1e-4,
+    **parametres,
+):
+    """
+    Taux de retrait initial le plus élevé atteignant une probabilité de succès cible
+
+    log_rendements : tableau (chemins, années) réutilisé pour chaque taux candidat
+    probabilite_cible : probabilité de succès visée (ex: 0.95)
+    strategie : clé de STRATEGIES_RETRAIT
+    taux_max : borne haute de la recherche
+    tolerance : précision sur le taux (règles adaptatives)
+
+    Montant constant : quantile (1 - cible) des taux soutenables de chaque chemin,
+    sans simulation. Règles adaptatives : dichotomie sur la courbe de succès, les
+    mêmes chemins servant à tous les candidats (nombres aléatoires communs) ; la
+    courbe est monotone et le résultat déterministe pour une graine.
+    """
+    if strategie == "Montant constant":
+        taux_chemins = _taux_soutenables(log_rendements)
+        return min(float(np.quantile(taux_chemins, 1 - probabilite_cible)), taux_max)
+
+    bas, haut = 0.0, taux_max
+    while haut - bas > tolerance:
+        milieu = (bas + haut) / 2
+        succes = simuler_retraits(log_rendements, 1.0, milieu, strategie, **parametres)[
+            "Succès"
+        ].mean()
+        if succes >= probabilite_cible:
+            bas = milieu
+        else:
+            haut = milieu
+    return bas
 
 
 def calculateur_fire_render():
@@ -65,6 +423,21 @@ def calculateur_fire_render():
     # --- Colonne 3 : Paramètres FIRE ---
     with col3:
         st.subheader("🔥 Hypothèses FIRE")
+        source_retrait = st.selectbox(
+            "📜 Source du taux de retrait",
+            [
+                "Saisie manuelle",
+                "Historique : pire cohorte",
+                "Historique : 10e percentile",
+                "Historique : médiane",
+            ],
+            key="fire_source_retrait",
+            help=(
+                "Les modes historiques calculent le taux de retrait qui aurait tenu "
+                "sur chaque période passée, à partir d'un fichier de rendements "
+                "mensuels du dossier data/ (CSV ou Parquet, colonne « rendement »)."
+            ),
+        )
         taux_retrait = st.number_input(
             label="🔥 Taux de retrait (%)",
             min_value=1.0,
@@ -72,6 +445,7 @@ def calculateur_fire_render():
             value=4.0,
             step=0.5,
             key="fire_retrait",
+            disabled=source_retrait != "Saisie manuelle",
             help="Pourcentage du patrimoine que vous pouvez retirer chaque année à la retraite (ex : règle des 4%).",
         )
 
@@ -85,6 +459,100 @@ def calculateur_fire_render():
             help="Votre âge aujourd'hui, utilisé pour estimer l'âge d'atteinte de l'indépendance.",
         )
 
+    # Taux de retrait issu des cohortes historiques (type étude Trinity)
+    if source_retrait != "Saisie manuelle":
+        with st.expander("📜 Étude des cohortes historiques", expanded=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                fichier_historique = st.selectbox(
+                    "Fichier de rendements mensuels",
+                    lister_fichiers_rendements(),
+                    key="fire_fichier_historique",
+                    help="Fichiers CSV ou Parquet placés dans le dossier data/. Utilisez des rendements réels (hors inflation) pour des retraits à pouvoir d'achat constant.",
+                )
+            with col2:
+                duree_cohortes = st.number_input(
+                    "Durée des cohortes (années)",
+                    min_value=10,
+                    max_value=60,
+                    value=30,
+                    step=5,
+                    key="fire_duree_cohortes",
+                )
+
+            log_rendements_mensuels = None
+            if fichier_historique is None:
+                st.warning(
+                    "⚠️ Aucun fichier de rendements (CSV ou Parquet) dans le dossier "
+                    "data/. Le taux de retrait saisi est conservé."
+                )
+            else:
+                try:
+                    log_rendements_mensuels = charger_rendements_historiques(
+                        fichier_historique
+                    )
+                except (OSError, ValueError, ImportError) as erreur:
+                    st.warning(
+                        f"⚠️ Impossible de lire {fichier_historique} : {erreur}. "
+                        "Le taux de retrait saisi est conservé."
+                    )
+
+            if log_rendements_mensuels is not None:
+                n_mois = log_rendements_mensuels.size // 12 * 12
+                log_rendements_annuels = regrouper_periodes(
+                    log_rendements_mensuels[:n_mois], 1
+                )
+                if log_rendements_annuels.size < duree_cohortes:
+                    st.warning(
+                        f"⚠️ L'historique ne couvre que {log_rendements_annuels.size} "
+                        "ans, moins que la durée des cohortes. "
+                        "Le taux de retrait saisi est conservé."
+                    )
+                else:
+                    taux_cohortes = 100 * taux_retrait_historiques(
+                        log_rendements_annuels, int(duree_cohortes)
+                    )
+                    taux_historiques = {
+                        "Historique : pire cohorte": taux_cohortes.min(),
+                        "Historique : 10e percentile": np.percentile(taux_cohortes, 10),
+                        "Historique : médiane": np.median(taux_cohortes),
+                    }
+                    taux_retrait = taux_historiques[source_retrait]
+
+                    col1, col2, col3, col4 = st.columns(4)
+                    col1.metric("Cohortes étudiées", f"{taux_cohortes.size}")
+                    col2.metric(
+                        "Pire cohorte",
+                        f"{taux_historiques['Historique : pire cohorte']:.2f}%",
+                    )
+                    col3.metric(
+                        "10e percentile",
+                        f"{taux_historiques['Historique : 10e percentile']:.2f}%",
+                    )
+                    col4.metric(
+                        "Médiane", f"{taux_historiques['Historique : médiane']:.2f}%"
+                    )
+
+                    fig_cohortes = go.Figure(
+                        go.Bar(
+                            x=np.arange(1, taux_cohortes.size + 1),
+                            y=taux_cohortes,
+                            name="Taux soutenable",
+                        )
+                    )
+                    fig_cohortes.add_hline(
+                        y=taux_retrait,
+                        line_dash="dash",
+                        line_color="red",
+                        annotation_text="Taux retenu",
+                    )
+                    fig_cohortes.update_layout(
+                        title=f"Taux de retrait maximal sur {duree_cohortes} ans selon l'année de départ",
+                        xaxis_title="Année de départ (rang dans l'historique)",
+                        yaxis_title="Taux de retrait (%)",
+                    )
+                    st.plotly_chart(fig_cohortes, use_container_width=True)
+
     # Calculs FIRE
     epargne_annuelle = revenus_annuels - depenses_annuelles
     taux_epargne = (
@@ -95,23 +563,9 @@ def calculateur_fire_render():
     nombre_fire = depenses_annuelles * (100 / taux_retrait)
 
     # Calcul du temps pour atteindre FIRE
-    if epargne_annuelle > 0 and taux_retour > 0:
-        r_annual = taux_retour / 100
-        if patrimoine_actuel >= nombre_fire:
-            annees_fire = 0
-        else:
-            # Formule pour calculer le temps nécessaire avec versements périodiques
-            if patrimoine_actuel > 0:
-                annees_fire = np.log(
-                    (nombre_fire * r_annual / epargne_annuelle + 1)
-                    / (patrimoine_actuel * r_annual / epargne_annuelle + 1)
-                ) / np.log(1 + r_annual)
-            else:
-                annees_fire = np.log(
-                    nombre_fire * r_annual / epargne_annuelle + 1
-                ) / np.log(1 + r_annual)
-    else:
-        annees_fire = float("inf")
+    annees_fire = annees_avant_fire(
+        patrimoine_actuel, epargne_annuelle, nombre_fire, taux_retour / 100
+    )
 
     age_fire = age_actuel + annees_fire
 
@@ -226,24 +680,126 @@ def calculateur_fire_render():
     # Note explicative
     st.markdown("---")
 
-    # Simulation évolution patrimoine
-    if annees_fire < 50:
-        annees_sim = list(range(0, int(annees_fire) + 10))
-        patrimoine_evolution = []
+    # Flux variables dans le temps
+    with st.expander("📅 Flux variables dans le temps"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            croissance_revenus = st.number_input(
+                "Croissance des revenus (%/an)",
+                min_value=-10.0,
+                max_value=20.0,
+                value=0.0,
+                step=0.5,
+                key="fire_croissance_revenus",
+            )
+        with col2:
+            inflation_depenses = st.number_input(
+                "Inflation des dépenses (%/an)",
+                min_value=-5.0,
+                max_value=20.0,
+                value=0.0,
+                step=0.5,
+                key="fire_inflation_depenses",
+            )
+        with col3:
+            pension_annuelle = st.number_input(
+                "Pension de retraite (€/an)",
+                min_value=0.0,
+                value=0.0,
+                step=1000.0,
+                format="%.0f",
+                key="fire_pension",
+                help="Montant en euros d'aujourd'hui, indexé comme les dépenses.",
+            )
+        with col4:
+            age_pension = st.number_input(
+                "Âge de début de la pension",
+                min_value=50,
+                max_value=75,
+                value=64,
+                step=1,
+                key="fire_age_pension",
+            )
+
+        st.markdown(
+            "**Événements ponctuels** (héritage, achat immobilier, études des enfants...)"
+        )
+        df_evenements_fire = st.data_editor(
+            pd.DataFrame(
+                {
+                    "Année": pd.Series(dtype="int"),
+                    "Montant (€)": pd.Series(dtype="float"),
+                    "Libellé": pd.Series(dtype="str"),
+                }
+            ),
+            num_rows="dynamic",
+            use_container_width=True,
+            key="fire_evenements",
+            column_config={
+                "Année": st.column_config.NumberColumn(
+                    min_value=1, max_value=80, step=1
+                ),
+                "Montant (€)": st.column_config.NumberColumn(
+                    help="Positif pour une rentrée d'argent, négatif pour une dépense"
+                ),
+            },
+        )
+        evenements_fire = (
+            df_evenements_fire.dropna(subset=["Année", "Montant (€)"])[
+                ["Année", "Montant (€)"]
+            ]
+            .to_numpy(dtype=float)
+            .tolist()
+        )
 
-        for annee in annees_sim:
-            if annee == 0:
-                patrimoine_evolution.append(patrimoine_actuel)
+    # Simulation évolution patrimoine : avec des flux variables, l'objectif peut être
+    # atteint même si le calcul à flux constants ne l'atteint jamais
+    flux_variables = (
+        croissance_revenus != 0
+        or inflation_depenses != 0
+        or pension_annuelle > 0
+        or len(evenements_fire) > 0
+    )
+    if annees_fire < 50 or flux_variables:
+        n_annees_projection = int(annees_fire) + 9 if annees_fire < 50 else 50
+        if pension_annuelle > 0:
+            n_annees_projection = max(
+                n_annees_projection, int(age_pension - age_actuel) + 5
+            )
+        projection = projeter_flux_patrimoine(
+            patrimoine_actuel,
+            revenus_annuels,
+            depenses_annuelles,
+            taux_retour / 100,
+            n_annees_projection,
+            croissance_revenus=croissance_revenus / 100,
+            inflation_depenses=inflation_depenses / 100,
+            evenements=evenements_fire,
+            pension_annuelle=pension_annuelle,
+            annee_pension=(age_pension - age_actuel) if pension_annuelle > 0 else None,
+        )
+        annees_sim = projection["Années"]
+        patrimoine_evolution = projection["Patrimoine"]
+
+        # Nombre FIRE de chaque année : dépenses non couvertes par la pension
+        objectif_fire = np.maximum(
+            projection["Dépenses"] - projection["Pension"], 0
+        ) * (100 / taux_retrait)
+        if flux_variables:
+            atteint = patrimoine_evolution >= objectif_fire
+            if atteint.any():
+                st.info(
+                    f"📅 Avec vos flux variables, l'objectif FIRE est atteint dans "
+                    f"{annees_sim[atteint.argmax()]} ans (à {age_actuel + annees_sim[atteint.argmax()]} ans)."
+                )
             else:
-                # Croissance du patrimoine avec intérêts composés et épargne annuelle
-                patrimoine = patrimoine_actuel * (1 + taux_retour / 100) ** annee
-                if epargne_annuelle > 0:
-                    patrimoine += epargne_annuelle * (
-                        ((1 + taux_retour / 100) ** annee - 1) / (taux_retour / 100)
-                    )
-                patrimoine_evolution.append(patrimoine)
+                st.warning(
+                    "📅 Avec vos flux variables, l'objectif FIRE n'est pas atteint "
+                    f"sur les {n_annees_projection} prochaines années."
+                )
 
-        if patrimoine_actuel <= patrimoine_manquant:
+        # Objectif atteint dès aujourd'hui (nombre FIRE net de la pension éventuelle)
+        if patrimoine_evolution[0] < objectif_fire[0]:
             fig_fire = go.Figure()
             fig_fire.add_trace(
                 go.Scatter(
@@ -254,11 +810,14 @@ def calculateur_fire_render():
                     line=dict(color="#ff7f0e"),
                 )
             )
-            fig_fire.add_hline(
-                y=nombre_fire,
-                line_dash="dash",
-                line_color="red",
-                annotation_text="Nombre FIRE",
+            fig_fire.add_trace(
+                go.Scatter(
+                    x=annees_sim,
+                    y=objectif_fire,
+                    mode="lines",
+                    name="Nombre FIRE",
+                    line=dict(color="red", dash="dash"),
+                )
             )
             fig_fire.update_layout(
                 title="Projection vers l'indépendance financière",
@@ -277,7 +836,6 @@ def calculateur_fire_render():
                     "Libre à vous de ralentir, pivoter ou explorer de nouveaux projets !"
                 )
                 st.balloons()
-            horizon_projection = int(annees_fire) + 5
             fig_fire = go.Figure()
             fig_fire.add_trace(
                 go.Scatter(
@@ -288,12 +846,14 @@ def calculateur_fire_render():
                     line=dict(color="#2ca02c"),
                 )
             )
-            fig_fire.add_hline(
-                y=nombre_fire,
-                line_dash="dash",
-                line_color="red",
-                annotation_text="Seuil FIRE atteint",
-                annotation_position="top right",
+            fig_fire.add_trace(
+                go.Scatter(
+                    x=annees_sim,
+                    y=objectif_fire,
+                    mode="lines",
+                    name="Seuil FIRE atteint",
+                    line=dict(color="red", dash="dash"),
+                )
             )
             fig_fire.update_layout(
                 title="🚀 Projection au-delà de l'indépendance financière",
@@ -302,3 +862,393 @@ def calculateur_fire_render():
                 showlegend=True,
             )
             st.plotly_chart(fig_fire, use_container_width=True)
+
+    # === Carte des années avant FIRE ===
+    st.markdown("---")
+    if st.checkbox(
+        "🗺️ Carte des années avant FIRE (taux d'épargne × rendement)",
+        key="fire_carte",
+    ):
+        st.caption(
+            f"Revenus de {format_nombre(revenus_annuels)} €, patrimoine de départ de "
+            f"{format_nombre(patrimoine_actuel)} € et taux de retrait de {taux_retrait:.2f}% : "
+            "les dépenses sont la part des revenus non épargnée."
+        )
+        grille_epargne = np.arange(0, 91)
+        grille_rendement = np.arange(0, 12.25, 0.25)
+
+        # Une seule expression diffusée : lignes = rendements, colonnes = taux d'épargne
+        epargne_grille = revenus_annuels * grille_epargne / 100
+        annees_grille = annees_avant_fire(
+            patrimoine_actuel,
+            epargne_grille,
+            (revenus_annuels - epargne_grille) * (100 / taux_retrait),
+            grille_rendement[:, None] / 100,
+        )
+        annees_affichees = np.where(np.isfinite(annees_grille), annees_grille, np.nan)
+
+        fig_carte = go.Figure()
+        fig_carte.add_trace(
+            go.Heatmap(
+                x=grille_epargne,
+                y=grille_rendement,
+                z=annees_affichees,
+                zmin=0,
+                zmax=60,
+                colorscale="RdYlGn_r",
+                colorbar=dict(title="Années"),
+                hovertemplate="Taux d'épargne : %{x}%<br>Rendement : %{y}%<br>"
+                "Années avant FIRE : %{z:.1f}<extra></extra>",
+            )
+        )
+        fig_carte.add_trace(
+            go.Contour(
+                x=grille_epargne,
+                y=grille_rendement,
+                z=annees_affichees,
+                contours=dict(
+                    coloring="lines", showlabels=True, start=5, end=60, size=5
+                ),
+                line=dict(color="white", width=1),
+                showscale=False,
+                hoverinfo="skip",
+            )
+        )
+        if np.isfinite(annees_fire) and annees_fire > 0:
+            fig_carte.add_trace(
+                go.Contour(
+                    x=grille_epargne,
+                    y=grille_rendement,
+                    z=annees_affichees,
+                    contours=dict(
+                        coloring="lines",
+                        showlabels=True,
+                        start=annees_fire,
+                        end=annees_fire,
+                        size=1,
+                    ),
+                    line=dict(color="black", width=3, dash="dash"),
+                    showscale=False,
+                    hoverinfo="skip",
+                    name="Votre horizon",
+                )
+            )
+        fig_carte.add_trace(
+            go.Scatter(
+                x=[taux_epargne],
+                y=[taux_retour],
+                mode="markers",
+                marker=dict(symbol="x", size=14, color="black"),
+                name="Votre situation",
+            )
+        )
+        fig_carte.update_layout(
+            title="Années avant FIRE selon le taux d'épargne et le rendement",
+            xaxis_title="Taux d'épargne (%)",
+            yaxis_title="Rendement annuel (%)",
+            showlegend=False,
+        )
+        st.plotly_chart(fig_carte, use_container_width=True)
+
+    # === Hypothèses communes aux simulations stochastiques ===
+    with st.expander("🎲 Hypothèses des simulations"):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            volatilite_fire = st.number_input(
+                "Volatilité annuelle (%)",
+                min_value=0.0,
+                max_value=50.0,
+                value=15.0,
+                step=1.0,
+                key="fire_volatilite",
+                help="Écart-type annuel des rendements de votre portefeuille.",
+            )
+        with col2:
+            duree_retraite = st.number_input(
+                "Durée de la retraite (années)",
+                min_value=10,
+                max_value=70,
+                value=min(70, max(10, 95 - int(age_actuel))),
+                step=5,
+                key="fire_duree_retraite",
+                help="Nombre d'années pendant lesquelles le capital doit financer vos dépenses.",
+            )
+        with col3:
+            n_chemins_fire = st.select_slider(
+                "Nombre de simulations",
+                options=[1_000, 5_000, 10_000, 50_000],
+                value=10_000,
+                key="fire_n_chemins",
+            )
+        with col4:
+            graine_fire = st.number_input(
+                "Graine aléatoire",
+                min_value=0,
+                value=42,
+                step=1,
+                key="fire_graine",
+            )
+
+        st.markdown("**Paramètres des stratégies de retrait**")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            garde_fou = st.number_input(
+                "Garde-fou Guyton-Klinger (%)",
+                min_value=5.0,
+                max_value=50.0,
+                value=20.0,
+                step=5.0,
+                key="fire_garde_fou",
+                help="Écart toléré entre le taux de retrait courant et le taux initial.",
+            )
+        with col2:
+            ajustement = st.number_input(
+                "Ajustement Guyton-Klinger (%)",
+                min_value=1.0,
+                max_value=30.0,
+                value=10.0,
+                step=1.0,
+                key="fire_ajustement",
+                help="Baisse ou hausse du retrait lorsqu'un garde-fou est franchi.",
+            )
+        with col3:
+            plancher = st.number_input(
+                "Plancher (% du retrait initial)",
+                min_value=50.0,
+                max_value=100.0,
+                value=85.0,
+                step=5.0,
+                key="fire_plancher",
+            )
+        with col4:
+            plafond = st.number_input(
+                "Plafond (% du retrait initial)",
+                min_value=100.0,
+                max_value=200.0,
+                value=125.0,
+                step=5.0,
+                key="fire_plafond",
+            )
+
+    parametres_strategies = {
+        "Garde-fous Guyton-Klinger": {
+            "garde_fou": garde_fou / 100,
+            "ajustement": ajustement / 100,
+        },
+        "Plancher / plafond": {"plancher": plancher / 100, "plafond": plafond / 100},
+    }
+
+    def chemins_retraite():
+        """Log-rendements annuels (chemins, années de retraite) pour la graine choisie"""
+        return np.concatenate(
+            list(
+                generer_log_rendements(
+                    n_chemins_fire,
+                    int(duree_retraite),
+                    taux_retour / 100,
+                    volatilite_fire / 100,
+                    periodes_par_an=1,
+                    graine=int(graine_fire),
+                )
+            )
+        )
+
+    # === Simulation Monte Carlo : risque de séquence des rendements ===
+    if st.checkbox(
+        "🎲 Simulation Monte Carlo (risque de séquence des rendements)",
+        key="fire_monte_carlo",
+    ):
+        simulation = simuler_fire_monte_carlo(
+            patrimoine_actuel,
+            epargne_annuelle,
+            depenses_annuelles,
+            taux_retrait,
+            taux_retour / 100,
+            volatilite_fire / 100,
+            duree_retraite=int(duree_retraite),
+            n_chemins=n_chemins_fire,
+            graine=int(graine_fire),
+        )
+        annees_simulees = simulation["Années FIRE"]
+        fire_atteint = np.isfinite(annees_simulees)
+
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(
+                "🎯 Probabilité d'atteindre FIRE",
+                f"{fire_atteint.mean():.1%}",
+                help="Part des simulations atteignant le nombre FIRE en moins de 60 ans.",
+            )
+        with col2:
+            st.metric(
+                "✅ Probabilité de succès",
+                f"{simulation['Succès'].mean():.1%}",
+                help=(
+                    "Part des simulations qui atteignent FIRE puis financent "
+                    f"{duree_retraite} ans de dépenses sans épuiser le capital."
+                ),
+            )
+        if fire_atteint.any():
+            p10, p50, p90 = np.percentile(annees_simulees[fire_atteint], [10, 50, 90])
+            with col3:
+                st.metric(
+                    "⏰ Temps médian avant FIRE",
+                    f"{p50:.0f} ans",
+                    help=f"80 % des cas entre {p10:.0f} et {p90:.0f} ans.",
+                )
+            with col4:
+                st.metric(
+                    "🛡️ Succès une fois FIRE atteint",
+                    f"{simulation['Succès'][fire_atteint].mean():.1%}",
+                    help="Probabilité de ne pas épuiser le capital une fois FIRE atteint.",
+                )
+
+            fig_dates = px.histogram(
+                x=annees_simulees[fire_atteint],
+                nbins=int(np.ptp(annees_simulees[fire_atteint])) + 1,
+                labels={"x": "Années avant FIRE"},
+                title="Distribution des dates d'atteinte de FIRE",
+            )
+            fig_dates.update_layout(yaxis_title="Nombre de simulations", bargap=0.05)
+            st.plotly_chart(fig_dates, use_container_width=True)
+
+    # === Stratégies de retrait pendant la retraite ===
+    if st.checkbox(
+        "💸 Comparer des stratégies de retrait pendant la retraite",
+        key="fire_strategies",
+    ):
+        if nombre_fire <= 0:
+            st.info(
+                "ℹ️ Renseignez des dépenses annuelles pour comparer les stratégies "
+                "de retrait : sans dépenses, le capital FIRE est nul."
+            )
+        else:
+            st.caption(
+                f"Départ avec le capital FIRE ({format_nombre(nombre_fire)} €) et un premier "
+                f"retrait égal à vos dépenses ({format_nombre(depenses_annuelles)} €), "
+                "toutes les stratégies étant évaluées sur les mêmes scénarios de marché."
+            )
+            strategies = st.multiselect(
+                "Stratégies",
+                options=list(STRATEGIES_RETRAIT),
+                default=list(STRATEGIES_RETRAIT),
+                key="fire_strategies_choix",
+            )
+            log_rendements_retraite = chemins_retraite()
+
+            synthese = []
+            fig_retraits = go.Figure()
+            for strategie in strategies:
+                resultat = simuler_retraits(
+                    log_rendements_retraite,
+                    nombre_fire,
+                    depenses_annuelles,
+                    strategie,
+                    **parametres_strategies.get(strategie, {}),
+                )
+                retraits = resultat["Retraits"]
+                synthese.append(
+                    {
+                        "Stratégie": strategie,
+                        "Probabilité de succès": f"{resultat['Succès'].mean():.1%}",
+                        "Retrait médian (€)": format_nombre(np.median(retraits)),
+                        "Pire retrait annuel (P10, €)": format_nombre(
+                            np.percentile(retraits.min(axis=1), 10)
+                        ),
+                        "Patrimoine final médian (€)": format_nombre(
+                            np.median(resultat["Patrimoine"][:, -1])
+                        ),
+                    }
+                )
+                fig_retraits.add_trace(
+                    go.Scatter(
+                        x=np.arange(1, retraits.shape[1] + 1),
+                        y=np.median(retraits, axis=0),
+                        mode="lines",
+                        name=strategie,
+                    )
+                )
+
+            if synthese:
+                st.dataframe(
+                    pd.DataFrame(synthese), use_container_width=True, hide_index=True
+                )
+                fig_retraits.add_hline(
+                    y=depenses_annuelles,
+                    line_dash="dash",
+                    line_color="red",
+                    annotation_text="Dépenses annuelles",
+                )
+                fig_retraits.update_layout(
+                    title="Retrait annuel médian selon la stratégie",
+                    xaxis_title="Années de retraite",
+                    yaxis_title="Retrait (€)",
+                )
+                st.plotly_chart(fig_retraits, use_container_width=True)
+
+    # === Taux de retrait sûr pour une probabilité de succès cible ===
+    if st.checkbox(
+        "🎯 Taux de retrait sûr pour une probabilité de succès cible",
+        key="fire_taux_sur",
+    ):
+        probabilite_cible = st.slider(
+            "Probabilité de succès visée (%)",
+            min_value=50,
+            max_value=99,
+            value=95,
+            step=1,
+            key="fire_probabilite_cible",
+        )
+        log_rendements_retraite = chemins_retraite()
+
+        # Stratégies dont le capital peut s'épuiser (le pourcentage constant ne le peut pas)
+        strategies_solveur = [
+            strategie
+            for strategie in STRATEGIES_RETRAIT
+            if strategie != "Pourcentage constant"
+        ]
+        col_metriques = st.columns(len(strategies_solveur))
+        for col, strategie in zip(col_metriques, strategies_solveur):
+            taux_sur = resoudre_taux_retrait(
+                log_rendements_retraite,
+                probabilite_cible / 100,
+                strategie,
+                **parametres_strategies.get(strategie, {}),
+            )
+            col.metric(
+                strategie,
+                f"{taux_sur:.2%}",
+                help=f"Capital FIRE correspondant : {format_nombre(depenses_annuelles / max(taux_sur, 1e-6))} €",
+            )
+
+        # Courbe de succès du retrait constant, lue directement sur les mêmes chemins
+        taux_chemins = np.sort(_taux_soutenables(log_rendements_retraite))
+        taux_candidats = np.linspace(0.01, 0.10, 181)
+        succes = 1 - np.searchsorted(taux_chemins, taux_candidats) / taux_chemins.size
+
+        fig_succes = go.Figure(
+            go.Scatter(
+                x=100 * taux_candidats,
+                y=100 * succes,
+                mode="lines",
+                name="Montant constant",
+            )
+        )
+        fig_succes.add_hline(
+            y=probabilite_cible,
+            line_dash="dash",
+            line_color="red",
+            annotation_text="Probabilité visée",
+        )
+        fig_succes.add_vline(
+            x=taux_retrait,
+            line_dash="dot",
+            line_color="gray",
+            annotation_text="Votre taux",
+        )
+        fig_succes.update_layout(
+            title=f"Probabilité de succès sur {duree_retraite} ans selon le taux de retrait (montant constant)",
+            xaxis_title="Taux de retrait initial (%)",
+            yaxis_title="Probabilité de succès (%)",
+        )
+        st.plotly_chart(fig_succes, use_container_width=True)
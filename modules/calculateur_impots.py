@@ -5,6 +5,16 @@ import plotly.graph_objects as go
 import streamlit as st
 from plotly.subplots import make_subplots
 
+from utils.fiscalite import (
+    annees_fiscales,
+    balayer_versements_per,
+    bareme_impot,
+    bases_par_tranche,
+    calculer_impot_revenu,
+    courbes_taux_impot,
+    optimiser_declaration,
+    plafond_per,
+)
 from utils.helpers import format_nombre
 
 
@@ -47,75 +57,24 @@ def calculateur_impots_render():
         }
 
         nb_parts = parts_fiscales[situation_familiale]
+        parts_de_base = 1 if situation_familiale == "Célibataire" else 2
 
     with col3:
         st.subheader("📆 Année Fiscale")
-        annee_fiscale = st.selectbox("Année fiscale", [2024, 2023], key="tmi_annee")
-
-        # Application de l'abattement de 10 % sur les revenus (plafonné à 13 522 € pour 2024)
-        plafond_abattement = 13522 if annee_fiscale == 2024 else 12912
-        abattement_10 = min(revenus_imposables * 0.10, plafond_abattement)
-        revenus_abattus = revenus_imposables - abattement_10
-
-    # Barème 2024 (revenus 2023)
-    if annee_fiscale == 2024:
-        tranches = [
-            (0, 11497, 0),
-            (11498, 29315, 11),
-            (29316, 83823, 30),
-            (83824, 180294, 41),
-            (180294, float("inf"), 45),
-        ]
-    else:  # 2023
-        tranches = [
-            (0, 11497, 0),
-            (11498, 29315, 11),
-            (29316, 83823, 30),
-            (83824, 180294, 41),
-            (180294, float("inf"), 45),
-        ]
-
-    # Calcul du quotient familial
-    quotient_familial = revenus_abattus / nb_parts
-
-    # Calcul de l'impôt par part
-    impot_par_part = 0
-    tmi = 0
-    impot_par_tranche = []
-
-    for seuil_inf, seuil_sup, taux in tranches:
-        if quotient_familial > seuil_inf:
-            base_imposable = min(quotient_familial, seuil_sup) - seuil_inf
-            impot_tranche = base_imposable * (taux / 100)
-            impot_par_part += impot_tranche
-            impot_par_tranche.append(
-                (
-                    f"{seuil_inf:,.0f} - {seuil_sup if seuil_sup != float('inf') else '∞'} €",
-                    impot_tranche * nb_parts,
-                )
-            )
-            if quotient_familial > seuil_inf:
-                tmi = taux
-
-    # Impôt total
-    impot_brut = impot_par_part * nb_parts
-
-    # Décote (si applicable)
-    if nb_parts <= 2:
-        seuil_decote = 1929 if annee_fiscale == 2024 else 1837
-        plafond_decote = 2590 if annee_fiscale == 2024 else 2469
-    else:
-        seuil_decote = (1929 if annee_fiscale == 2024 else 1837) * nb_parts / 2
-        plafond_decote = (2590 if annee_fiscale == 2024 else 2469) * nb_parts / 2
-
-    decote = 0
-    if impot_brut < seuil_decote:
-        decote = min(impot_brut, (seuil_decote - impot_brut) * 0.45)
-
-    impot_net = max(0, impot_brut - decote)
+        annee_fiscale = st.selectbox(
+            "Année fiscale", annees_fiscales(), key="tmi_annee"
+        )
 
-    # Taux moyen
-    taux_moyen = (impot_net / revenus_imposables * 100) if revenus_abattus > 0 else 0
+    # Calcul vectorisé : abattement de 10 %, quotient familial plafonné, barème et décote
+    resultat_impot = calculer_impot_revenu(
+        revenus_imposables, nb_parts, annee_fiscale, parts_de_base
+    )
+    revenus_abattus = resultat_impot["Revenu imposable"]
+    quotient_familial = resultat_impot["Quotient familial"]
+    decote = resultat_impot["Décote"]
+    impot_net = resultat_impot["Impôt"]
+    tmi = resultat_impot["TMI"]
+    taux_moyen = resultat_impot["Taux moyen"]
 
     # Revenus nets après IR
     revenus_nets_ir = revenus_abattus - impot_net
@@ -154,7 +113,7 @@ def calculateur_impots_render():
     with col2:
         st.metric(
             "📊 TMI",
-            f"{tmi}%",
+            f"{tmi:.0f}%",
             help="Tranche Marginale d'Imposition - taux appliqué à votre dernière tranche de revenus",
         )
 
@@ -192,12 +151,15 @@ def calculateur_impots_render():
     col1, col2 = st.columns(2)
     with col1:
         detail_tranches = []
-        cumul_impot = 0
-        for i, (seuil_inf, seuil_sup, taux) in enumerate(tranches):
+        bareme = bareme_impot(annee_fiscale)
+        bornes, taux_tranches = bareme["bornes"], bareme["taux"]
+        bases = bases_par_tranche(quotient_familial, annee_fiscale)
+        impots_tranches = bases * taux_tranches / 100
+        bornes_hautes = np.append(bornes[1:], np.inf)
+        for seuil_inf, seuil_sup, taux, base, impot_tranche in zip(
+            bornes, bornes_hautes, taux_tranches, bases, impots_tranches
+        ):
             if quotient_familial > seuil_inf:
-                base = min(quotient_familial, seuil_sup) - seuil_inf
-                impot_tranche = base * (taux / 100)
-                cumul_impot += impot_tranche
                 if seuil_sup == float("inf"):
                     tranche_desc = f"Au-delà de {seuil_inf:,.0f} €"
                 else:
@@ -205,7 +167,7 @@ def calculateur_impots_render():
                 detail_tranches.append(
                     {
                         "Tranche": tranche_desc,
-                        "Taux": f"{taux}%",
+                        "Taux": f"{taux:.0f}%",
                         "Base (QF)": f"{base:,.0f} €",
                         "Impôt/part": f"{impot_tranche:,.0f} €",
                         "Impôt total": f"{impot_tranche * nb_parts:,.0f} €",
@@ -318,7 +280,292 @@ def calculateur_impots_render():
         else:
             st.info("Aucune donnée de tranche disponible")
 
-        # Conseils d'optimisation fiscale
+    # Courbes de taux sur toute la plage de revenus
+    st.subheader("📈 Taux marginal effectif et taux moyen")
+    st.caption(
+        f"Situation : {situation_familiale} ({nb_parts} parts), barème {annee_fiscale}. "
+        "Le taux marginal effectif est l'impôt supplémentaire payé sur chaque euro "
+        "brut gagné en plus, décote et abattement de 10 % compris."
+    )
+    courbes = courbes_taux_impot(
+        np.arange(0, 500_001, 250),
+        nb_parts,
+        annee_fiscale,
+        parts_de_base=parts_de_base,
+    )
+
+    fig_taux = make_subplots(specs=[[{"secondary_y": True}]])
+    fig_taux.add_trace(
+        go.Scatter(
+            x=courbes["Revenus bruts"],
+            y=courbes["Taux marginal effectif"],
+            mode="lines",
+            name="Taux marginal effectif",
+            line=dict(color="#ff4757", shape="hv"),
+        ),
+        secondary_y=False,
+    )
+    fig_taux.add_trace(
+        go.Scatter(
+            x=courbes["Revenus bruts"],
+            y=courbes["Taux moyen"],
+            mode="lines",
+            name="Taux moyen",
+            line=dict(color="#4682b4"),
+        ),
+        secondary_y=False,
+    )
+    fig_taux.add_trace(
+        go.Scatter(
+            x=courbes["Revenus bruts"],
+            y=courbes["Revenu net"],
+            mode="lines",
+            name="Revenu après impôt",
+            line=dict(color="#2ca02c", dash="dot"),
+        ),
+        secondary_y=True,
+    )
+    fig_taux.add_vline(
+        x=revenus_imposables,
+        line_dash="dash",
+        line_color="gray",
+        annotation_text="Vos revenus",
+    )
+    fig_taux.update_layout(
+        xaxis_title="Revenus bruts annuels (€)",
+        hovermode="x unified",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02),
+    )
+    fig_taux.update_yaxes(title_text="Taux (%)", secondary_y=False)
+    fig_taux.update_yaxes(title_text="Revenu après impôt (€)", secondary_y=True)
+    st.plotly_chart(fig_taux, use_container_width=True)
+
+    # Optimisation de la déclaration du foyer
+    if st.checkbox(
+        "👫 Optimiser la déclaration du foyer (imposition commune ou séparée)",
+        key="tmi_optimisation_foyer",
+    ):
+        st.caption(
+            "Compare l'imposition commune (mariage, PACS) à toutes les façons de "
+            "rattacher les enfants à deux déclarations séparées (concubinage, année "
+            "du mariage ou du PACS), plafonnement du quotient familial compris."
+        )
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            revenus_declarant_1 = st.number_input(
+                "Revenus bruts déclarant 1 (€)",
+                min_value=0.0,
+                value=float(revenus_imposables),
+                step=1000.0,
+                format="%.0f",
+                key="tmi_revenus_declarant_1",
+            )
+        with col2:
+            revenus_declarant_2 = st.number_input(
+                "Revenus bruts déclarant 2 (€)",
+                min_value=0.0,
+                value=25000.0,
+                step=1000.0,
+                format="%.0f",
+                key="tmi_revenus_declarant_2",
+            )
+        with col3:
+            enfants_exclusifs = st.number_input(
+                "Enfants à charge exclusive",
+                min_value=0,
+                max_value=10,
+                value=0,
+                step=1,
+                key="tmi_enfants_exclusifs",
+            )
+        with col4:
+            enfants_alternes = st.number_input(
+                "Enfants en résidence alternée",
+                min_value=0,
+                max_value=10,
+                value=0,
+                step=1,
+                key="tmi_enfants_alternes",
+                help="Chaque enfant en résidence alternée apporte la moitié de la majoration de parts.",
+            )
+
+        declarations = optimiser_declaration(
+            revenus_declarant_1,
+            revenus_declarant_2,
+            int(enfants_exclusifs),
+            int(enfants_alternes),
+            annee_fiscale,
+        )
+        df_declarations = pd.DataFrame(declarations)
+        meilleure = df_declarations.iloc[0]
+        impot_commune = df_declarations.loc[
+            df_declarations["Imposition"] == "Commune", "Impôt total"
+        ].iloc[0]
+        impot_separee = df_declarations.loc[
+            df_declarations["Imposition"] == "Séparée", "Impôt total"
+        ].min()
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("💑 Imposition commune", f"{format_nombre(impot_commune)} €")
+        col2.metric(
+            "🧍 Meilleure imposition séparée", f"{format_nombre(impot_separee)} €"
+        )
+        col3.metric(
+            "💰 Écart",
+            f"{format_nombre(abs(impot_commune - impot_separee))} €",
+            help="Différence entre l'imposition commune et la meilleure imposition séparée",
+        )
+
+        if meilleure["Imposition"] == "Commune":
+            st.success(
+                f"✅ L'imposition commune est la plus avantageuse : "
+                f"{format_nombre(meilleure['Impôt total'])} € d'impôt."
+            )
+        else:
+            st.success(
+                f"✅ Configuration la moins imposée : déclarations séparées, "
+                f"{meilleure['Enfants déclarant 1']} enfant(s) rattaché(s) au déclarant 1 "
+                f"et {meilleure['Enfants déclarant 2']} au déclarant 2, pour "
+                f"{format_nombre(meilleure['Impôt total'])} € d'impôt."
+            )
+
+        st.dataframe(
+            df_declarations.style.format(
+                {
+                    "Parts déclarant 1": "{:.2f}",
+                    "Parts déclarant 2": "{:.2f}",
+                    "Impôt déclarant 1": "{:,.0f} €",
+                    "Impôt déclarant 2": "{:,.0f} €",
+                    "Impôt total": "{:,.0f} €",
+                }
+            ),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+    # Versements PER : économie d'impôt pour chaque montant jusqu'au plafond
+    plafond_per_annee = plafond_per(revenus_imposables, annee_fiscale)
+    balayage_per = balayer_versements_per(
+        revenus_imposables, nb_parts, annee_fiscale, parts_de_base
+    )
+
+    if st.checkbox("🏦 Optimiser mes versements PER", key="tmi_per"):
+        col1, col2 = st.columns(2)
+        with col1:
+            plafonds_reportes = st.number_input(
+                "Plafonds non utilisés des 3 années précédentes (€)",
+                min_value=0.0,
+                value=0.0,
+                step=500.0,
+                format="%.0f",
+                key="tmi_per_reports",
+                help="Montants indiqués sur votre avis d'impôt, qui s'ajoutent au plafond de l'année.",
+            )
+        plafond_total = plafond_per_annee + plafonds_reportes
+        # Le balayage au plafond de l'année reste celui du conseil PER plus bas
+        balayage_plafond = balayage_per
+        if plafonds_reportes > 0:
+            balayage_plafond = balayer_versements_per(
+                revenus_imposables,
+                nb_parts,
+                annee_fiscale,
+                parts_de_base,
+                plafond=plafond_total,
+            )
+        with col2:
+            versement_per = st.slider(
+                "Versement envisagé (€)",
+                min_value=0,
+                max_value=int(plafond_total),
+                value=int(plafond_total) // 2,
+                step=100,
+                key="tmi_per_versement",
+            )
+
+        versements = balayage_plafond["Versement"]
+        economies = balayage_plafond["Économie"]
+        indice_versement = min(
+            np.searchsorted(versements, versement_per), versements.size - 1
+        )
+        economie_versement = economies[indice_versement]
+
+        # Versements à partir desquels le foyer change de tranche
+        changements = np.flatnonzero(np.diff(balayage_plafond["TMI"])) + 1
+
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("📏 Plafond déductible", f"{format_nombre(plafond_total)} €")
+        col2.metric(
+            "💰 Économie au plafond",
+            f"{format_nombre(economies[-1])} €",
+            help=f"Soit {economies[-1] / max(plafond_total, 1):.0%} du versement",
+        )
+        col3.metric(
+            "🎯 Économie du versement envisagé",
+            f"{format_nombre(economie_versement)} €",
+            help=f"Soit {economie_versement / max(versement_per, 1):.0%} du versement",
+        )
+        if changements.size:
+            col4.metric(
+                "⚠️ Changement de tranche",
+                f"{format_nombre(versements[changements[0]])} €",
+                help=(
+                    f"Au-delà, vous passez de la tranche à "
+                    f"{balayage_plafond['TMI'][changements[0] - 1]:.0f}% à celle à "
+                    f"{balayage_plafond['TMI'][changements[0]]:.0f}% : chaque euro "
+                    "supplémentaire rapporte moins."
+                ),
+            )
+        else:
+            col4.metric(
+                "✅ Tranche conservée",
+                f"{balayage_plafond['TMI'][0]:.0f}%",
+                help="Tout le plafond est déduit dans votre tranche actuelle.",
+            )
+
+        fig_per = make_subplots(
+            rows=2,
+            cols=1,
+            shared_xaxes=True,
+            vertical_spacing=0.08,
+            subplot_titles=(
+                "Économie d'impôt cumulée (€)",
+                "Économie sur le dernier euro versé (%)",
+            ),
+        )
+        fig_per.add_trace(
+            go.Scatter(
+                x=versements,
+                y=economies,
+                mode="lines",
+                name="Économie cumulée",
+                line=dict(color="#2ca02c"),
+            ),
+            row=1,
+            col=1,
+        )
+        fig_per.add_trace(
+            go.Scatter(
+                x=versements,
+                y=balayage_plafond["Économie marginale"],
+                mode="lines",
+                name="Économie marginale",
+                line=dict(color="#ff7f0e", shape="hv"),
+            ),
+            row=2,
+            col=1,
+        )
+        for indice in changements:
+            fig_per.add_vline(
+                x=versements[indice],
+                line_dash="dot",
+                line_color="red",
+                annotation_text=f"Tranche {balayage_plafond['TMI'][indice]:.0f}%",
+            )
+        fig_per.add_vline(x=versement_per, line_dash="dash", line_color="gray")
+        fig_per.update_layout(showlegend=False, height=550)
+        fig_per.update_xaxes(title_text="Versement PER annuel (€)", row=2, col=1)
+        st.plotly_chart(fig_per, use_container_width=True)
+
     # Conseils d'optimisation fiscale
     st.subheader("💡 Conseils d'optimisation fiscale")
 
@@ -354,7 +601,10 @@ def calculateur_impots_render():
                 "titre": "Plan d'Épargne Retraite (PER)",
                 "emoji": "📊",
                 "description": "Déduction fiscale sur vos revenus",
-                "avantage": "Jusqu'à 10% de vos revenus déductibles",
+                "avantage": (
+                    f"Jusqu'à {format_nombre(plafond_per_annee)} € déductibles, soit "
+                    f"{format_nombre(balayage_per['Économie'][-1])} € d'impôt en moins"
+                ),
                 "priorite": "Très élevée",
                 "categorie": "Retraite & Défiscalisation",
             }
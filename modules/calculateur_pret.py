@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 import pandas as pd
 import plotly.express as px
@@ -8,6 +10,373 @@ from plotly.subplots import make_subplots
 from utils.helpers import format_nombre
 
 
+def calculer_mensualite(montant, taeg, duree_mois):
+    """
+    Mensualité constante d'un prêt amortissable (formule de l'annuité)
+
+    montant : capital emprunté (€)
+    taeg : taux annuel en % (ex: 2.5 pour 2,5 %)
+    duree_mois : nombre de mensualités
+
+    Accepte des scalaires ou des tableaux NumPy (broadcasting).
+    """
+    montant = np.asarray(montant, dtype=float)
+    taux_mensuel = np.asarray(taeg, dtype=float) / 100 / 12
+    duree_mois = np.asarray(duree_mois, dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mensualite = montant * taux_mensuel / (1 - (1 + taux_mensuel) ** -duree_mois)
+    return np.where(taux_mensuel > 0, mensualite, montant / duree_mois)
+
+
+def _capital_restant_du(montant, mensualite, taux_mensuel, mois):
+    """Capital restant dû après k mensualités constantes (forme fermée)"""
+    if taux_mensuel > 0:
+        facteur = (1 + taux_mensuel) ** mois
+        return montant * facteur - mensualite * (facteur - 1) / taux_mensuel
+    return montant - mensualite * mois.astype(float)
+
+
+def _arrondir_centimes(montants, regle="bancaire"):
+    """
+    Convertit un montant (ou un tableau de montants) en centimes entiers (int64)
+
+    regle : "bancaire" (demi au pair le plus proche) ou "commerciale" (demi vers le haut)
+    """
+    centimes = np.asarray(montants, dtype=float) * 100
+    if regle == "bancaire":
+        return np.rint(centimes).astype(np.int64)
+    return np.floor(centimes + 0.5).astype(np.int64)
+
+
+def calculer_tableau_amortissement(
+    montant, taeg, duree_mois, centimes_exacts=False, regle_arrondi="bancaire"
+):
+    """
+    Tableau d'amortissement complet, calculé en une seule passe vectorisée
+
+    montant : capital emprunté (€)
+    taeg : taux annuel en %
+    duree_mois : nombre de mensualités
+    centimes_exacts : True pour calculer en centimes entiers (int64), comme une banque
+    regle_arrondi : règle d'arrondi au centime en mode exact ("bancaire" ou "commerciale")
+
+    Renvoie un dict de tableaux NumPy (une clé par colonne, ligne 0 = mois 0).
+    La dernière mensualité est ajustée pour solder exactement le capital restant.
+    """
+    taux_mensuel = taeg / 100 / 12
+    mensualite = float(calculer_mensualite(montant, taeg, duree_mois))
+    mois = np.arange(duree_mois + 1)
+
+    if centimes_exacts:
+        return _tableau_en_centimes(
+            montant, mensualite, taux_mensuel, duree_mois, regle_arrondi
+        )
+
+    capital_restant = _capital_restant_du(montant, mensualite, taux_mensuel, mois)
+    capital_restant[-1] = 0.0
+    capital_restant = np.round(capital_restant, 2)
+
+    interets = np.zeros(duree_mois + 1)
+    capital = np.zeros(duree_mois + 1)
+    interets[1:] = np.round(capital_restant[:-1] * taux_mensuel, 2)
+    # Dernier mois : le capital remboursé est le capital restant dû
+    capital[1:] = np.round(capital_restant[:-1] - capital_restant[1:], 2)
+
+    # Chaque ligne se réconcilie : mensualité = intérêts + capital, au centime
+    mensualites = np.round(capital + interets, 2)
+
+    return {
+        "Mois": mois,
+        "Année": np.where(mois > 0, (mois - 1) // 12 + 1, 0),
+        "Mensualité": mensualites,
+        "Intérêts": interets,
+        "Capital": capital,
+        "Cumul_Interets": np.round(np.cumsum(interets), 2),
+        "Cumul_Capital": np.round(np.cumsum(capital), 2),
+        "Capital_Restant": capital_restant,
+    }
+
+
+def _tableau_en_centimes(montant, mensualite, taux_mensuel, duree_mois, regle):
+    """
+    Variante exacte au centime de calculer_tableau_amortissement
+
+    La mensualité est arrondie une fois ; chaque mois, les intérêts sont arrondis
+    sur le capital restant dû en centimes entiers du mois précédent, comme dans un
+    échéancier bancaire. Cette récurrence est séquentielle (quelques centaines
+    d'itérations sur des entiers) ; le dernier mois solde exactement le capital.
+    """
+    mois = np.arange(duree_mois + 1)
+    mensualite_centimes = int(_arrondir_centimes(mensualite, regle))
+
+    interets = np.zeros(duree_mois + 1, dtype=np.int64)
+    capital = np.zeros(duree_mois + 1, dtype=np.int64)
+    capital_initial = int(_arrondir_centimes(montant, regle))
+    solde = capital_initial
+    for m in range(1, duree_mois + 1):
+        interets_mois = solde * taux_mensuel
+        if regle == "bancaire":
+            interets[m] = round(interets_mois)
+        else:
+            interets[m] = math.floor(interets_mois + 0.5)
+        # Dernier mois : le capital remboursé est le capital restant dû
+        capital[m] = solde if m == duree_mois else mensualite_centimes - interets[m]
+        solde -= int(capital[m])
+
+    mensualites = capital + interets
+    cumul_capital = np.cumsum(capital)
+
+    return {
+        "Mois": mois,
+        "Année": np.where(mois > 0, (mois - 1) // 12 + 1, 0),
+        "Mensualité": mensualites / 100,
+        "Intérêts": interets / 100,
+        "Capital": capital / 100,
+        "Cumul_Interets": np.cumsum(interets) / 100,
+        "Cumul_Capital": cumul_capital / 100,
+        "Capital_Restant": (capital_initial - cumul_capital) / 100,
+    }
+
+
+def calculer_resume_annuel(tableau):
+    """
+    Agrégats annuels d'un tableau d'amortissement, sans passer par un DataFrame
+
+    tableau : dict de colonnes renvoyé par calculer_tableau_amortissement
+    ou calculer_echeancier_evenements
+
+    Les flux (mensualités, intérêts, capital) sont sommés par blocs de 12 mois,
+    les cumuls et le capital restant sont lus au dernier mois de chaque année.
+    L'année 0 correspond à la ligne de départ.
+    """
+    nb_mois = tableau["Mois"].size - 1
+    debuts = np.concatenate(([0], np.arange(1, nb_mois + 1, 12)))
+    fins = np.append(debuts[1:], nb_mois + 1) - 1
+
+    resume = {"Année": tableau["Année"][debuts]}
+    for colonne in (
+        "Mensualité",
+        "Intérêts",
+        "Capital",
+        "Remboursement_Anticipe",
+        "Interets_Capitalises",
+    ):
+        if colonne in tableau:
+            resume[colonne] = np.add.reduceat(tableau[colonne], debuts)
+    resume["Mensualité"] = resume["Mensualité"] / (fins - debuts + 1)
+
+    for colonne in ("Taux", "Cumul_Interets", "Cumul_Capital", "Capital_Restant"):
+        if colonne in tableau:
+            resume[colonne] = tableau[colonne][fins]
+    return resume
+
+
+def evaluer_grille_offres(montant, taegs, durees_annees):
+    """
+    Évalue toutes les combinaisons (TAEG × durée) en un seul calcul matriciel
+
+    montant : capital emprunté (€)
+    taegs : tableau 1D de taux annuels en %
+    durees_annees : tableau 1D de durées en années
+
+    Renvoie un dict de tableaux 2D (lignes = durées, colonnes = taux) :
+    mensualité, intérêts totaux et ratio intérêts / capital.
+    """
+    taegs = np.asarray(taegs, dtype=float)
+    durees_mois = np.asarray(durees_annees, dtype=float)[:, None] * 12
+
+    mensualites = calculer_mensualite(montant, taegs[None, :], durees_mois)
+    interets_totaux = mensualites * durees_mois - montant
+
+    return {
+        "Mensualité": mensualites,
+        "Intérêts totaux": interets_totaux,
+        "Ratio intérêts": interets_totaux / montant,
+    }
+
+
+def _evoluer_segment(capital_depart, taux_mensuel, mensualite, nb_mois, mode):
+    """
+    Capital restant dû et intérêts sur un segment à paramètres constants (forme fermée)
+
+    mode : "amortissable", "differe_partiel" (intérêts seuls) ou "differe_total"
+    (intérêts capitalisés, aucune mensualité)
+
+    Le segment est tronqué au mois où le capital est soldé.
+    """
+    k = np.arange(1, nb_mois + 1)
+    facteur = (1 + taux_mensuel) ** k
+
+    if mode == "differe_total":
+        capital_restant = capital_depart * facteur
+    elif mode == "differe_partiel":
+        capital_restant = np.full(nb_mois, float(capital_depart))
+    elif taux_mensuel > 0:
+        capital_restant = (
+            capital_depart * facteur - mensualite * (facteur - 1) / taux_mensuel
+        )
+    else:
+        capital_restant = capital_depart - mensualite * k
+
+    solde = np.flatnonzero(capital_restant <= 0.005)
+    if solde.size:
+        capital_restant = capital_restant[: solde[0] + 1]
+        capital_restant[-1] = 0.0
+
+    precedent = np.concatenate(([capital_depart], capital_restant[:-1]))
+    interets = precedent * taux_mensuel
+    return capital_restant, interets
+
+
+def calculer_echeancier_evenements(montant, taeg, duree_mois, evenements=()):
+    """
+    Échéancier d'un prêt découpé en segments par des événements,
+    chaque segment étant calculé en forme fermée
+
+    montant : capital emprunté (€)
+    taeg : taux annuel initial en %
+    duree_mois : durée contractuelle en mois (différés compris)
+    evenements : liste de dicts, appliqués à l'issue du mois "mois" :
+        {"mois": k, "type": "remboursement", "montant": X, "reduire": "duree" | "mensualite"}
+        {"mois": k, "type": "taux", "taeg": nouveau TAEG en %}
+        {"mois": k, "type": "differe", "duree": d, "total": True | False}
+
+    Après une révision de taux ou la fin d'un différé, la mensualité est recalculée
+    pour solder le prêt à l'échéance prévue. Un remboursement anticipé conserve la
+    mensualité (durée réduite) sauf si "reduire" vaut "mensualite".
+
+    Renvoie un dict de tableaux NumPy au même format que calculer_tableau_amortissement,
+    complété des colonnes "Taux", "Remboursement_Anticipe" et "Interets_Capitalises"
+    (intérêts ajoutés au capital pendant un différé total, sans mensualité).
+    """
+    # Chaque événement ouvre un nouveau segment ; un différé ouvre et ferme le sien
+    bornes = {}
+    for evenement in evenements:
+        mois_evenement = int(evenement["mois"])
+        bornes.setdefault(mois_evenement, []).append(evenement)
+        if evenement["type"] == "differe":
+            bornes.setdefault(mois_evenement + int(evenement["duree"]), []).append(
+                {"type": "fin_differe"}
+            )
+
+    capital_restant = float(montant)
+    taux = taeg
+    fin = duree_mois
+    mode = "amortissable"
+    mensualite = float(calculer_mensualite(capital_restant, taux, fin))
+    debut = 0
+
+    soldes, interets, taux_segments = [np.array([capital_restant])], [[0.0]], [[taux]]
+    differes_totaux = [[False]]
+    anticipes = np.zeros(duree_mois + 1)
+
+    for mois_evenement in sorted(bornes) + [fin]:
+        borne = min(mois_evenement, fin)
+        if borne > debut:
+            solde_segment, interets_segment = _evoluer_segment(
+                capital_restant, taux / 100 / 12, mensualite, borne - debut, mode
+            )
+            soldes.append(solde_segment)
+            interets.append(interets_segment)
+            taux_segments.append(np.full(solde_segment.size, taux))
+            differes_totaux.append(np.full(solde_segment.size, mode == "differe_total"))
+            debut += solde_segment.size
+            capital_restant = solde_segment[-1]
+
+        if capital_restant <= 0 or debut >= fin or mois_evenement >= fin:
+            break
+
+        recalcul = False
+        for evenement in bornes[mois_evenement]:
+            if evenement["type"] == "remboursement":
+                rembourse = min(evenement["montant"], capital_restant)
+                capital_restant -= rembourse
+                anticipes[debut] += rembourse
+                if evenement.get("reduire") == "mensualite":
+                    recalcul = True
+                elif mode == "amortissable" and capital_restant > 0:
+                    # Mensualité conservée : nouvelle échéance en forme fermée
+                    taux_mensuel = taux / 100 / 12
+                    if taux_mensuel > 0:
+                        restant = -np.log(
+                            1 - capital_restant * taux_mensuel / mensualite
+                        ) / np.log(1 + taux_mensuel)
+                    else:
+                        restant = capital_restant / mensualite
+                    fin = min(fin, debut + int(np.ceil(restant - 1e-9)))
+            elif evenement["type"] == "taux":
+                taux = evenement["taeg"]
+                recalcul = True
+            elif evenement["type"] == "differe":
+                mode = "differe_total" if evenement.get("total") else "differe_partiel"
+            else:  # fin_differe
+                mode = "amortissable"
+                recalcul = True
+
+        if capital_restant <= 0:
+            break
+        if recalcul and mode == "amortissable":
+            mensualite = float(calculer_mensualite(capital_restant, taux, fin - debut))
+
+    capital_restant = np.concatenate(soldes)
+    interets = np.concatenate(interets)
+    taux_mois = np.concatenate(taux_segments)
+    differe_total = np.concatenate(differes_totaux)
+    nb_mois = capital_restant.size - 1
+    anticipes = np.round(anticipes[: nb_mois + 1], 2)
+
+    # Le capital restant dû est affiché après remboursement anticipé ;
+    # le dernier mois solde ce qui reste
+    capital_restant = capital_restant - anticipes
+    capital_restant[-1] = 0.0
+    capital_restant = np.round(np.maximum(capital_restant, 0.0), 2)
+
+    interets = np.round(interets, 2)
+    capital = np.zeros(nb_mois + 1)
+    capital[1:] = np.round(
+        capital_restant[:-1] - capital_restant[1:] - anticipes[1:], 2
+    )
+    # Différé total : aucune mensualité, les intérêts s'ajoutent au capital restant dû
+    capitalises = np.where(differe_total, np.round(-capital, 2), 0.0)
+    interets = np.where(differe_total, capitalises, interets)
+    capital = np.where(differe_total, 0.0, capital)
+    mensualites = np.round(capital + interets - capitalises, 2)
+    mois = np.arange(nb_mois + 1)
+
+    return {
+        "Mois": mois,
+        "Année": np.where(mois > 0, (mois - 1) // 12 + 1, 0),
+        "Taux": taux_mois,
+        "Mensualité": mensualites,
+        "Intérêts": interets,
+        "Capital": capital,
+        "Remboursement_Anticipe": anticipes,
+        "Interets_Capitalises": capitalises,
+        "Cumul_Interets": np.round(np.cumsum(interets), 2),
+        "Cumul_Capital": np.round(np.cumsum(capital + anticipes), 2),
+        "Capital_Restant": capital_restant,
+    }
+
+
+def calculer_capacite_emprunt(mensualite, taegs, durees_annees):
+    """
+    Capital maximal empruntable pour une mensualité donnée (inversion de l'annuité)
+
+    mensualite : mensualité maximale (€)
+    taegs : tableau 1D de taux annuels en %
+    durees_annees : tableau 1D de durées en années
+
+    Renvoie un tableau 2D (lignes = durées, colonnes = taux).
+    """
+    taux_mensuel = np.asarray(taegs, dtype=float)[None, :] / 100 / 12
+    durees_mois = np.asarray(durees_annees, dtype=float)[:, None] * 12
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        capacite = mensualite * (1 - (1 + taux_mensuel) ** -durees_mois) / taux_mensuel
+    return np.where(taux_mensuel > 0, capacite, mensualite * durees_mois)
+
+
 def calculateur_pret_render():
     st.header("🏠 Simulateur de Prêt Immobilier")
 
@@ -88,68 +457,145 @@ def calculateur_pret_render():
         if taeg > taux_usure:
             st.caption("❌ Ce taux est impossible. Il est supérieur au taux d'usure.")
 
-    st.markdown("---")
-
-    # Calculs
-    mois = duree_mois
-    taux_mensuel = taeg / 100 / 12
-    if taux_mensuel > 0:
-        mensualite = montant * (taux_mensuel / (1 - (1 + taux_mensuel) ** -mois))
-    else:
-        mensualite = montant / mois
-
-    # Construction du tableau d'amortissement
-    data = []
-    capital_restant = montant
-    cumul_interets = 0
-    cumul_capital = 0
+    evenements = []
+    with st.expander(
+        "⚙️ Options avancées : différé, remboursements anticipés, taux variable",
+        expanded=False,
+    ):
+        col1, col2 = st.columns(2)
+        with col1:
+            differe_mois = st.number_input(
+                "Différé initial (mois)",
+                min_value=0,
+                max_value=36,
+                value=0,
+                step=1,
+                key="pret_differe",
+                help="Période en début de prêt pendant laquelle le capital n'est pas remboursé.",
+            )
+        with col2:
+            type_differe = st.radio(
+                "Type de différé",
+                ["Partiel", "Total"],
+                horizontal=True,
+                key="pret_type_differe",
+                help=(
+                    "**Partiel** : seuls les intérêts sont payés. "
+                    "**Total** : aucune mensualité, les intérêts s'ajoutent au capital."
+                ),
+            )
 
-    for i in range(0, mois + 1):
-        if i == 0:
-            data.append(
+        if differe_mois > 0:
+            evenements.append(
                 {
-                    "Mois": i,
-                    "Année": 0,
-                    "Mensualité": 0,
-                    "Intérêts": 0,
-                    "Capital": 0,
-                    "Cumul_Interets": 0,
-                    "Cumul_Capital": 0,
-                    "Capital_Restant": round(capital_restant, 2),
+                    "mois": 0,
+                    "type": "differe",
+                    "duree": differe_mois,
+                    "total": type_differe == "Total",
                 }
             )
-        else:
-            interet = round(capital_restant * taux_mensuel, 2)
-
-            # Dernier mois : on ajuste pour solder le capital restant
-            if i == mois:
-                capital = capital_restant
-                mensualite = round(capital + interet, 2)
-            else:
-                capital = round(mensualite - interet, 2)
-
-            capital_restant = round(max(0, capital_restant - capital), 2)
-            cumul_interets = round(cumul_interets + interet, 2)
-            cumul_capital = round(cumul_capital + capital, 2)
 
-            data.append(
+        st.caption(
+            "Ajoutez des remboursements anticipés (valeur en €) ou des révisions de taux "
+            "(valeur = nouveau TAEG en %), appliqués à l'issue du mois indiqué."
+        )
+        df_evenements = st.data_editor(
+            pd.DataFrame(
                 {
-                    "Mois": i,
-                    "Année": (i - 1) // 12 + 1,
-                    "Mensualité": mensualite,
-                    "Intérêts": interet,
-                    "Capital": capital,
-                    "Cumul_Interets": cumul_interets,
-                    "Cumul_Capital": cumul_capital,
-                    "Capital_Restant": capital_restant,
+                    "Mois": pd.Series(dtype="int"),
+                    "Type": pd.Series(dtype="str"),
+                    "Valeur": pd.Series(dtype="float"),
+                    "Impact": pd.Series(dtype="str"),
                 }
+            ),
+            num_rows="dynamic",
+            use_container_width=True,
+            key="pret_evenements",
+            column_config={
+                "Mois": st.column_config.NumberColumn(
+                    min_value=1, max_value=int(duree_mois) - 1, step=1
+                ),
+                "Type": st.column_config.SelectboxColumn(
+                    options=["Remboursement anticipé", "Révision de taux"]
+                ),
+                "Valeur": st.column_config.NumberColumn(min_value=0.0),
+                "Impact": st.column_config.SelectboxColumn(
+                    options=["Réduire la durée", "Réduire la mensualité"],
+                    help="Effet d'un remboursement anticipé",
+                ),
+            },
+        )
+
+        lignes_completes = df_evenements.dropna(subset=["Mois", "Type", "Valeur"])
+        for ligne in lignes_completes.itertuples():
+            if ligne.Type == "Remboursement anticipé":
+                evenements.append(
+                    {
+                        "mois": int(ligne.Mois),
+                        "type": "remboursement",
+                        "montant": ligne.Valeur,
+                        "reduire": (
+                            "mensualite"
+                            if ligne.Impact == "Réduire la mensualité"
+                            else "duree"
+                        ),
+                    }
+                )
+            else:
+                evenements.append(
+                    {"mois": int(ligne.Mois), "type": "taux", "taeg": ligne.Valeur}
+                )
+
+        # L'échéancier par segments n'a pas de variante au centime
+        col1, col2 = st.columns(2)
+        with col1:
+            centimes_exacts = st.checkbox(
+                "Calcul exact au centime",
+                value=False,
+                key="pret_centimes",
+                disabled=bool(evenements),
+                help="Calcule le tableau en centimes entiers, comme les échéanciers bancaires.",
+            )
+        with col2:
+            regle_arrondi = st.selectbox(
+                "Règle d'arrondi",
+                ["Bancaire (demi au pair)", "Commerciale (demi vers le haut)"],
+                key="pret_arrondi",
+                disabled=not centimes_exacts or bool(evenements),
+            )
+        if evenements:
+            st.caption(
+                "ℹ️ Le calcul exact au centime n'est pas disponible avec un différé, "
+                "des remboursements anticipés ou des révisions de taux."
             )
 
-    df = pd.DataFrame(data)
+    st.markdown("---")
+
+    # Calculs
+    mois = duree_mois
+    if evenements:
+        tableau = calculer_echeancier_evenements(montant, taeg, mois, evenements)
+        # Mensualité affichée : première échéance amortissable
+        mensualite = tableau["Mensualité"][tableau["Capital"] > 0][0]
+    else:
+        tableau = calculer_tableau_amortissement(
+            montant,
+            taeg,
+            mois,
+            centimes_exacts=centimes_exacts,
+            regle_arrondi=(
+                "bancaire" if regle_arrondi.startswith("Bancaire") else "commerciale"
+            ),
+        )
+        mensualite = tableau["Mensualité"][1]
+    df = pd.DataFrame(tableau)
 
     # Métriques principales
-    total_interets = df["Cumul_Interets"].iloc[-1]
-    total_rembourse = mensualite * mois
+    total_interets = tableau["Cumul_Interets"][-1]
+    total_rembourse = (
+        tableau["Mensualité"].sum()
+        + tableau.get("Remboursement_Anticipe", np.zeros(1)).sum()
+    )
     ratio_interet = total_interets / montant
 
     # Affichage des métriques avec des couleurs
@@ -194,19 +640,29 @@ def calculateur_pret_render():
 
     st.markdown("---")
 
-    df = df.rename(
-        columns={
-            "Mensualité": "Mensualité (€)",
-            "Intérêts": "Intérêts (€)",
-            "Capital": "Capital Remboursé (€)",
-            "Cumul_Interets": "Cumul Intérêts (€)",
-            "Cumul_Capital": "Cumul Capital (€)",
-            "Capital_Restant": "Capital Restant (€)",
-        }
-    )
+    noms_colonnes = {
+        "Mensualité": "Mensualité (€)",
+        "Intérêts": "Intérêts (€)",
+        "Capital": "Capital Remboursé (€)",
+        "Cumul_Interets": "Cumul Intérêts (€)",
+        "Cumul_Capital": "Cumul Capital (€)",
+        "Capital_Restant": "Capital Restant (€)",
+        "Taux": "Taux (%)",
+        "Remboursement_Anticipe": "Remboursement anticipé (€)",
+        "Interets_Capitalises": "Intérêts capitalisés (€)",
+    }
+    df = df.rename(columns=noms_colonnes)
 
     # Création des tabs
-    tabs = st.tabs(["Graphiques", "Tableau complet", "Résumé par année"])
+    tabs = st.tabs(
+        [
+            "Graphiques",
+            "Tableau complet",
+            "Résumé par année",
+            "Comparer les offres",
+            "Capacité d'emprunt",
+        ]
+    )
 
     with tabs[0]:
         fig = go.Figure()
@@ -263,20 +719,147 @@ def calculateur_pret_render():
 
     with tabs[2]:
         st.subheader("Résumé annuel")
-        df_annual = (
-            df.groupby("Année")
-            .agg(
-                {
-                    "Mensualité (€)": "mean",
-                    "Intérêts (€)": "sum",
-                    "Capital Remboursé (€)": "sum",
-                    "Cumul Intérêts (€)": "max",
-                    "Cumul Capital (€)": "max",
-                    "Capital Restant (€)": "min",
-                }
-            )
-            .reset_index()
+        df_annual = pd.DataFrame(calculer_resume_annuel(tableau)).rename(
+            columns=noms_colonnes
         )
         st.dataframe(
             df_annual.style.format("{:.2f}"), hide_index=True, use_container_width=True
         )
+
+    with tabs[3]:
+        st.subheader("Comparaison des offres (taux × durée)")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            plage_taux = st.slider(
+                "Plage de TAEG (%)",
+                min_value=0.1,
+                max_value=10.0,
+                value=(0.1, 10.0),
+                step=0.1,
+                key="pret_grille_taux",
+            )
+        with col2:
+            plage_durees = st.slider(
+                "Plage de durées (ans)",
+                min_value=1,
+                max_value=30,
+                value=(1, 30),
+                key="pret_grille_durees",
+            )
+        with col3:
+            indicateur = st.selectbox(
+                "Indicateur affiché",
+                ["Mensualité", "Intérêts totaux", "Ratio intérêts"],
+                key="pret_grille_indicateur",
+            )
+
+        taux_grille = np.round(np.arange(plage_taux[0], plage_taux[1] + 0.05, 0.1), 1)
+        durees_grille = np.arange(plage_durees[0], plage_durees[1] + 1)
+        grille = evaluer_grille_offres(montant, taux_grille, durees_grille)
+
+        fig_grille = go.Figure(
+            go.Heatmap(
+                x=taux_grille,
+                y=durees_grille,
+                z=grille[indicateur],
+                colorscale="RdYlGn_r",
+                colorbar=dict(title=indicateur),
+                hovertemplate=(
+                    "TAEG : %{x:.1f} %<br>Durée : %{y} ans<br>"
+                    + indicateur
+                    + " : %{z:,.2f}<extra></extra>"
+                ),
+            )
+        )
+
+        # Signalement des cellules au-dessus du taux d'usure
+        taux_mesh, durees_mesh = np.meshgrid(taux_grille, durees_grille)
+        masque_usure = taux_mesh > taux_usure
+        if masque_usure.any():
+            fig_grille.add_trace(
+                go.Scatter(
+                    x=taux_mesh[masque_usure],
+                    y=durees_mesh[masque_usure],
+                    mode="markers",
+                    marker=dict(symbol="x", size=5, color="black", opacity=0.5),
+                    name="Au-dessus du taux d'usure",
+                    hoverinfo="skip",
+                )
+            )
+            fig_grille.add_vline(
+                x=taux_usure,
+                line_dash="dash",
+                line_color="black",
+                annotation_text="Taux d'usure",
+            )
+
+        fig_grille.update_layout(
+            xaxis_title="TAEG (%)",
+            yaxis_title="Durée (ans)",
+            template="plotly_white",
+            height=550,
+            legend=dict(
+                orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1
+            ),
+        )
+        st.plotly_chart(fig_grille, use_container_width=True)
+        st.caption(
+            f"❌ Les cellules marquées d'une croix dépassent le taux d'usure ({taux_usure} %)."
+        )
+
+    with tabs[4]:
+        st.subheader("Combien puis-je emprunter ?")
+
+        col1, col2 = st.columns([1, 2])
+        with col1:
+            mensualite_max = st.number_input(
+                "Mensualité maximale (€)",
+                min_value=100.0,
+                max_value=20_000.0,
+                value=float(np.clip(round(mensualite, -1), 100.0, 20_000.0)),
+                step=50.0,
+                format="%.0f",
+                key="pret_mensualite_max",
+                help="Montant que vous pouvez consacrer chaque mois au remboursement.",
+            )
+
+        durees_capacite = np.arange(1, 31)
+        taux_capacite = np.round(np.arange(0.1, taux_usure + 0.05, 0.1), 1)
+        capacites = calculer_capacite_emprunt(
+            mensualite_max, taux_capacite, durees_capacite
+        )
+
+        # Capacité pour le TAEG et la durée saisis
+        capacite_actuelle = calculer_capacite_emprunt(
+            mensualite_max, [taeg], [duree_mois / 12]
+        )[0, 0]
+        with col1:
+            st.metric(
+                "🏦 Capacité d'emprunt",
+                f"{format_nombre(capacite_actuelle)} €",
+                help=f"Au TAEG de {taeg} % sur {duree_mois / 12:.0f} ans.",
+            )
+
+        with col2:
+            fig_capacite = go.Figure()
+            # Une courbe par demi-point de taux, jusqu'au taux d'usure
+            demi_points = np.isclose(np.round(taux_capacite * 2), taux_capacite * 2)
+            for indice in np.flatnonzero(demi_points):
+                fig_capacite.add_trace(
+                    go.Scatter(
+                        x=durees_capacite,
+                        y=capacites[:, indice],
+                        mode="lines",
+                        name=f"{taux_capacite[indice]:.1f} %",
+                    )
+                )
+            fig_capacite.update_layout(
+                title="Capital empruntable selon la durée et le taux",
+                xaxis_title="Durée (ans)",
+                yaxis_title="Capital maximal (€)",
+                hovermode="x unified",
+                template="plotly_white",
+                height=550,
+            )
+            st.plotly_chart(fig_capacite, use_container_width=True)
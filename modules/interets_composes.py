@@ -6,6 +6,415 @@ import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
+from utils.fiscalite import calculer_impot_revenu
+from utils.historique import (
+    bootstrap_par_blocs,
+    charger_rendements_historiques,
+    fenetres_glissantes,
+    lister_fichiers_rendements,
+    regrouper_periodes,
+)
+from utils.simulation import (
+    bandes_percentiles,
+    generer_log_rendements,
+    trajectoires_patrimoine,
+)
+
+
+def log_croissance_annuelle(r, n):
+    """
+    Logarithme du facteur de croissance sur un an
+
+    r : taux annuel (ex: 0.05 pour 5%)
+    n : fréquence de capitalisation (float("inf") pour la capitalisation continue)
+    """
+    r = np.asarray(r, dtype=float)
+    n = np.asarray(n, dtype=float)
+    continue_ = np.isinf(n)
+    n_fini = np.where(continue_, 1.0, n)
+    return np.where(continue_, r, n_fini * np.log1p(r / n_fini))
+
+
+def calculer_interet_compose_avance(P, PMT, r, n, m, t, debut_periode=False):
+    """
+    Calcul des intérêts composés avec fréquences différentes pour capitalisation et versements
+
+    P : capital initial
+    PMT : montant du versement périodique
+    r : taux annuel (ex: 0.05 pour 5%)
+    n : fréquence de capitalisation (nombre de périodes d'intérêt par an, inf = continue)
+    m : fréquence des versements (nombre de versements par an)
+    t : durée en années
+    debut_periode : True si versements en début de période, False si fin de période
+
+    Les versements forment une série géométrique de raison q = (1 + r/n)^(n/m)
+    (e^(r/m) en continu), évaluée en O(1). Tous les paramètres acceptent des
+    tableaux NumPy (broadcasting).
+    """
+    log_g = log_croissance_annuelle(r, n)
+    t = np.asarray(t, dtype=float)
+    m = np.asarray(m, dtype=float)
+
+    # Valeur future du capital initial
+    FV_capital = P * np.exp(log_g * t)
+
+    # Valeur future des versements : PMT * (q^N - 1) / (q - 1), écrit en log pour r → 0
+    nb_versements = np.floor(m * t + 1e-9)
+    log_q = log_g / m
+    with np.errstate(divide="ignore", invalid="ignore"):
+        serie = np.where(
+            log_q != 0, np.expm1(nb_versements * log_q) / np.expm1(log_q), nb_versements
+        )
+    # Temps restant après le dernier versement, et décalage d'une période en début
+    decalage = m * t - nb_versements + np.where(debut_periode, 1.0, 0.0)
+    FV_versements = PMT * serie * np.exp(log_q * decalage)
+
+    return np.asarray(FV_capital + FV_versements)[()]
+
+
+def comparer_frequences(
+    P,
+    versement_annuel,
+    r,
+    t,
+    frequences_capitalisation,
+    frequences_versement,
+    moments_debut=(False,),
+):
+    """
+    Compare toutes les combinaisons de fréquences en un seul calcul vectorisé
+
+    P : capital initial
+    versement_annuel : effort d'épargne annuel, réparti en m versements de versement_annuel / m
+    r : taux annuel (ex: 0.05 pour 5%)
+    t : durée en années
+    frequences_capitalisation : tableau de fréquences n (inf = continue)
+    frequences_versement : tableau de fréquences m
+    moments_debut : tableau de booléens (True = début de période)
+
+    Renvoie un dict de tableaux de forme (capitalisation, versement, moment).
+    """
+    n = np.asarray(frequences_capitalisation, dtype=float)[:, None, None]
+    m = np.asarray(frequences_versement, dtype=float)[None, :, None]
+    debut = np.asarray(moments_debut, dtype=bool)[None, None, :]
+
+    valeurs = calculer_interet_compose_avance(
+        P, versement_annuel / m, r, n, m, t, debut
+    )
+    total_verse = P + versement_annuel / m * np.floor(m * t + 1e-9)
+
+    return {"Valeur finale": valeurs, "Intérêts": valeurs - total_verse}
+
+
+def simuler_monte_carlo(
+    P,
+    PMT,
+    m,
+    t,
+    rendement_moyen,
+    volatilite,
+    n_chemins=10_000,
+    debut_periode=False,
+    graine=None,
+    rendements_historiques=None,
+    taille_bloc=12,
+):
+    """
+    Simulation Monte Carlo du placement avec rendements aléatoires
+
+    P, PMT, m, t, debut_periode : comme calculer_interet_compose_avance
+    rendement_moyen : rendement annuel moyen espéré (ex: 0.05 pour 5%)
+    volatilite : écart-type annuel des rendements (ex: 0.15 pour 15%)
+    n_chemins : nombre de trajectoires simulées
+    rendements_historiques : log-rendements mensuels historiques ; s'ils sont fournis,
+    les chemins sont tirés par bootstrap par blocs de taille_bloc mois au lieu
+    de la loi log-normale
+
+    Les rendements sont tirés à chaque versement (m périodes par an), par lots,
+    et seule la valeur en fin de chaque année est conservée : la mémoire reste
+    de l'ordre de n_chemins × (t + 1). Renvoie un tableau (n_chemins, t + 1).
+    """
+    n_periodes = int(m * t)
+    indices_annuels = np.arange(int(t) + 1) * int(m)
+
+    if rendements_historiques is None:
+        lots_rendements = generer_log_rendements(
+            n_chemins, n_periodes, rendement_moyen, volatilite, m, graine
+        )
+    else:
+        lots_rendements = (
+            regrouper_periodes(lot, m)
+            for lot in bootstrap_par_blocs(
+                rendements_historiques, n_chemins, int(12 * t), taille_bloc, graine
+            )
+        )
+
+    lots = [
+        trajectoires_patrimoine(log_rendements, P, PMT, debut_periode)[
+            :, indices_annuels
+        ]
+        for log_rendements in lots_rendements
+    ]
+    return np.concatenate(lots)
+
+
+def backtest_historique(log_rendements_mensuels, P, PMT, m, t, debut_periode=False):
+    """
+    Rejoue le placement sur toutes les périodes historiques de t années
+
+    log_rendements_mensuels : série historique de log-rendements mensuels
+    P, PMT, m, t, debut_periode : comme calculer_interet_compose_avance
+
+    Chaque mois de départ de la série donne une trajectoire ; les fenêtres sont des
+    vues glissantes évaluées toutes à la fois. Renvoie un tableau
+    (n_fenetres, t + 1) des valeurs en fin d'année.
+    """
+    fenetres = fenetres_glissantes(log_rendements_mensuels, int(12 * t))
+    trajectoires = trajectoires_patrimoine(
+        regrouper_periodes(fenetres, m), P, PMT, debut_periode
+    )
+    return trajectoires[:, np.arange(int(t) + 1) * int(m)]
+
+
+def calc_van_versements_avance(P, PMT, i, m, t, debut_periode=False):
+    """
+    Calcul de la valeur actuelle nette des versements
+
+    i : taux d'actualisation annuel (ex: l'inflation, 0.018 pour 1,8%)
+    m, t, debut_periode : mêmes conventions que calculer_interet_compose_avance
+
+    La valeur actuelle est la valeur future au taux i (capitalisation annuelle)
+    ramenée à t=0 ; t peut être un tableau pour obtenir toute la courbe.
+    """
+    t = np.asarray(t, dtype=float)
+    valeur_future = calculer_interet_compose_avance(P, PMT, i, 1, m, t, debut_periode)
+    return valeur_future * np.exp(-t * np.log1p(i))
+
+
+def _selon_duree(duree_annees, seuil, taux_long, taux_court):
+    """Taux applicable selon l'ancienneté (duree_annees scalaire ou tableau)"""
+    return np.where(np.asarray(duree_annees) >= seuil, taux_long, taux_court)[()]
+
+
+def calculer_taux_imposition_effectif(
+    type_placement,
+    duree_annees,
+    type_revenus,
+    tmi_personnelle=None,
+    utiliser_tmi=False,
+):
+    """
+    Calcule le taux d'imposition effectif selon le type de placement et la durée
+
+    duree_annees peut être un tableau NumPy : un taux par ancienneté.
+    """
+
+    if not utiliser_tmi or tmi_personnelle is None:
+        # Utilisation des taux standard (PFU)
+        if type_placement == "CTO (Compte-titres ordinaire)":
+            return 30.0  # PFU : 17,2% IR + 12,8% PS
+        elif type_placement == "PEA":
+            # Seulement prélèvements sociaux après 5 ans, PFU complet avant
+            return _selon_duree(duree_annees, 5, 12.8, 30.0)
+        else:  # Assurance-vie
+            # 7,5% IR + 12,8% PS (après abattement) au-delà de 8 ans
+            return _selon_duree(duree_annees, 8, 7.5 + 12.8, 30.0)
+    else:
+        # Utilisation de la TMI personnelle
+        taux_bareme = min(30.0, tmi_personnelle + 12.8)
+        if type_placement == "CTO (Compte-titres ordinaire)":
+            if type_revenus == "Plus-values mobilières":
+                return 12.8  # Seulement prélèvements sociaux pour les PV
+            else:  # Dividendes ou intérêts
+                # Option entre PFU (30%) ou barème progressif (TMI + 12,8%)
+                return taux_bareme  # Le plus avantageux
+        elif type_placement == "PEA":
+            # Seulement prélèvements sociaux après 5 ans, barème ou PFU avant
+            return _selon_duree(duree_annees, 5, 12.8, taux_bareme)
+        else:  # Assurance-vie
+            if type_revenus == "Plus-values mobilières":
+                taux_long = 7.5 + 12.8  # Taux spécifique AV
+            else:
+                taux_long = min(tmi_personnelle, 7.5) + 12.8
+            return _selon_duree(duree_annees, 8, taux_long, taux_bareme)
+
+
+def evaluer_placement(
+    P,
+    PMT,
+    r,
+    n,
+    m,
+    t,
+    debut_periode=False,
+    taux_imposition=0.0,
+    abattement=0.0,
+    taux_inflation=0.0,
+):
+    """
+    Valeurs brute, nette d'impôt et réelle du placement à l'horizon t
+
+    P, PMT, r, n, m, t, debut_periode : comme calculer_interet_compose_avance
+    taux_imposition : taux d'imposition des intérêts en %
+    abattement : abattement sur les intérêts (€)
+    taux_inflation : taux d'inflation annuel (ex: 0.018 pour 1,8%), qui sert aussi
+    à actualiser les versements
+
+    Tous les paramètres acceptent des tableaux NumPy (broadcasting).
+    """
+    t = np.asarray(t, dtype=float)
+    valeurs_brutes = calculer_interet_compose_avance(P, PMT, r, n, m, t, debut_periode)
+    versements_cumules = P + PMT * m * t
+
+    # Impôt sur les intérêts uniquement, après abattement éventuel
+    interets = valeurs_brutes - versements_cumules
+    interets_imposables = np.maximum(0, interets - abattement)
+    impots = interets_imposables * (np.asarray(taux_imposition) / 100)
+    valeurs_nettes = valeurs_brutes - impots
+
+    return {
+        "Valeur brute": valeurs_brutes,
+        "Versements cumulés": versements_cumules,
+        "Intérêts imposables": interets_imposables,
+        "Impôts": impots,
+        "Valeur nette": valeurs_nettes,
+        "Valeur réelle": valeurs_nettes / (1 + taux_inflation) ** t,
+        "Versements actualisés": calc_van_versements_avance(
+            P, PMT, taux_inflation, m, t, debut_periode
+        ),
+    }
+
+
+def calculer_serie_annuelle(
+    P,
+    PMT,
+    r,
+    n,
+    m,
+    t,
+    debut_periode=False,
+    taux_imposition=0.0,
+    abattement=0.0,
+    taux_inflation=0.0,
+):
+    """
+    Évolution du placement année par année (de 0 à t) en une seule passe vectorisée
+
+    Mêmes paramètres que evaluer_placement ; taux_imposition et abattement peuvent
+    être donnés année par année. Renvoie un dict de tableaux de longueur t + 1.
+    """
+    annees = np.arange(int(t) + 1)
+    serie = evaluer_placement(
+        P,
+        PMT,
+        r,
+        n,
+        m,
+        annees,
+        debut_periode,
+        taux_imposition,
+        abattement,
+        taux_inflation,
+    )
+    return {"Années": annees, **serie}
+
+
+def _newton_bisection(fonction, cible, borne_basse, borne_haute, tolerance=0.005):
+    """
+    Résout fonction(x) = cible pour une fonction croissante sur [borne_basse, borne_haute]
+
+    Pas de Newton (dérivée numérique), remplacé par une bisection s'il sort de
+    l'intervalle. Renvoie None si la cible n'est pas atteignable dans l'intervalle.
+    """
+    if fonction(borne_basse) >= cible:
+        return borne_basse
+    if fonction(borne_haute) < cible:
+        return None
+
+    x = (borne_basse + borne_haute) / 2
+    for _ in range(100):
+        ecart = fonction(x) - cible
+        if abs(ecart) < tolerance:
+            break
+        if ecart > 0:
+            borne_haute = x
+        else:
+            borne_basse = x
+
+        pas = 1e-6 * max(1.0, abs(x))
+        pente = (fonction(x + pas) - fonction(x)) / pas
+        x_newton = x - ecart / pente if pente > 0 else None
+        if x_newton is not None and borne_basse < x_newton < borne_haute:
+            x = x_newton
+        else:
+            x = (borne_basse + borne_haute) / 2
+    return x
+
+
+def resoudre_objectif(
+    cible, inconnue, mesure="Valeur brute", duree_max=100, **parametres
+):
+    """
+    Valeur de l'inconnue permettant d'atteindre une valeur finale cible
+
+    cible : valeur finale visée (€)
+    inconnue : "PMT" (versement périodique), "r" (taux annuel) ou "t" (durée en années)
+    mesure : "Valeur brute", "Valeur nette" ou "Valeur réelle"
+    duree_max : horizon maximal exploré pour la durée
+    parametres : arguments de evaluer_placement, sauf l'inconnue ; pour "t",
+    taux_imposition et abattement peuvent être des tableaux indexés par année (0 à duree_max)
+
+    - PMT : inversion en forme fermée si aucun impôt ne s'applique (valeur affine
+      en PMT), Newton/bisection sinon ;
+    - r : Newton/bisection entre 0 et 100 % ;
+    - t : première année entière atteignant la cible, sur toutes les durées à la fois.
+
+    Renvoie None si la cible est hors d'atteinte.
+    """
+
+    def valeur(x):
+        return float(evaluer_placement(**{**parametres, inconnue: x})[mesure])
+
+    if inconnue == "t":
+        valeurs = evaluer_placement(**{**parametres, "t": np.arange(duree_max + 1)})
+        atteint = np.flatnonzero(valeurs[mesure] >= cible)
+        return int(atteint[0]) if atteint.size else None
+
+    if inconnue == "PMT":
+        sans_impot = not np.any(np.asarray(parametres.get("taux_imposition", 0.0)))
+        if sans_impot or mesure == "Valeur brute":
+            valeur_sans_versement = valeur(0.0)
+            pente = valeur(1.0) - valeur_sans_versement
+            if pente <= 0:
+                return None
+            return max(0.0, (cible - valeur_sans_versement) / pente)
+        return _newton_bisection(valeur, cible, 0.0, max(cible, 1.0))
+
+    return _newton_bisection(valeur, cible, 0.0, 1.0, tolerance=1e-3)
+
+
+def analyse_sensibilite(parametres, scenarios, mesure="Valeur brute"):
+    """
+    Évalue toutes les variations d'hypothèses en un seul appel vectorisé
+
+    parametres : arguments de référence de evaluer_placement
+    scenarios : dict {libellé: (surcharges_basses, surcharges_hautes)}, chaque
+    surcharge étant un dict des paramètres modifiés
+    mesure : "Valeur brute", "Valeur nette" ou "Valeur réelle"
+
+    Renvoie (valeur de référence, dict {libellé: (valeur basse, valeur haute)}).
+    """
+    variantes = [{}] + [
+        surcharge for paire in scenarios.values() for surcharge in paire
+    ]
+    colonnes = {
+        cle: np.array([variante.get(cle, reference) for variante in variantes])
+        for cle, reference in parametres.items()
+    }
+    valeurs = evaluer_placement(**colonnes)[mesure]
+    resultats = valeurs[1:].reshape(-1, 2)
+    return valeurs[0], dict(zip(scenarios, map(tuple, resultats)))
+
 
 def interets_composes_render():
     st.header("🏦 Calculateur d'Intérêts Composés")
@@ -108,88 +517,6 @@ def interets_composes_render():
     st.subheader("Options avancées")
     col1, col2, col3 = st.columns(3)
 
-    # Fonction helper pour calculer la TMI
-    def calculer_tmi_simplifiee(revenus_annuels, nb_parts=1, annee=2024):
-        """Calcul simplifié de la TMI"""
-        if annee == 2024:
-            tranches = [
-                (0, 11497, 0),
-                (11498, 29315, 11),
-                (29316, 83823, 30),
-                (83824, 180294, 41),
-                (180294, float("inf"), 45),
-            ]
-        else:  # 2023
-            tranches = [
-                (0, 11497, 0),
-                (11498, 29315, 11),
-                (29316, 83823, 30),
-                (83824, 180294, 41),
-                (180294, float("inf"), 45),
-            ]
-
-        quotient_familial = revenus_annuels / nb_parts
-        tmi = 0
-
-        for seuil_inf, seuil_sup, taux in tranches:
-            if quotient_familial > seuil_inf:
-                tmi = taux
-
-        return tmi
-
-    def calculer_taux_imposition_effectif(
-        type_placement,
-        duree_annees,
-        type_revenus,
-        tmi_personnelle=None,
-        utiliser_tmi=False,
-    ):
-        """Calcule le taux d'imposition effectif selon le type de placement et la durée"""
-
-        if not utiliser_tmi or tmi_personnelle is None:
-            # Utilisation des taux standard (PFU)
-            if type_placement == "CTO (Compte-titres ordinaire)":
-                return 30.0  # PFU : 17,2% IR + 12,8% PS
-            elif type_placement == "PEA":
-                if duree_annees >= 5:
-                    return 12.8  # Seulement prélèvements sociaux
-                else:
-                    return 30.0  # PFU complet si retrait avant 5 ans
-            else:  # Assurance-vie
-                if duree_annees >= 8:
-                    return 7.5 + 12.8  # 7,5% IR + 12,8% PS (après abattement)
-                else:
-                    return 30.0
-        else:
-            # Utilisation de la TMI personnelle
-            if type_placement == "CTO (Compte-titres ordinaire)":
-                if type_revenus == "Plus-values mobilières":
-                    return 12.8  # Seulement prélèvements sociaux pour les PV
-                elif type_revenus == "Dividendes":
-                    # Option entre PFU (30%) ou barème progressif (TMI + 12,8%)
-                    taux_bareme = tmi_personnelle + 12.8
-                    return min(30.0, taux_bareme)  # Le plus avantageux
-                else:  # Intérêts
-                    taux_bareme = tmi_personnelle + 12.8
-                    return min(30.0, taux_bareme)
-            elif type_placement == "PEA":
-                if duree_annees >= 5:
-                    return 12.8  # Seulement prélèvements sociaux
-                else:
-                    # Avant 5 ans, utilisation du barème ou PFU
-                    taux_bareme = tmi_personnelle + 12.8
-                    return min(30.0, taux_bareme)
-            else:  # Assurance-vie
-                if duree_annees >= 8:
-                    if type_revenus == "Plus-values mobilières":
-                        return 7.5 + 12.8  # Taux spécifique AV
-                    else:
-                        taux_bareme = min(tmi_personnelle, 7.5) + 12.8
-                        return taux_bareme
-                else:
-                    taux_bareme = tmi_personnelle + 12.8
-                    return min(30.0, taux_bareme)
-
     with col1:
         ajuster_inflation = st.checkbox(
             "Ajuster à l'inflation", value=False, key="ic_inflation_check"
@@ -285,8 +612,10 @@ def interets_composes_render():
 
         # Calcul et affichage TMI
         with col4:
-            tmi_personnelle = calculer_tmi_simplifiee(revenus_annuels_tmi, nb_parts_ic)
-            st.metric("Votre TMI", f"{tmi_personnelle}%")
+            tmi_personnelle = calculer_impot_revenu(revenus_annuels_tmi, nb_parts_ic)[
+                "TMI"
+            ]
+            st.metric("Votre TMI", f"{tmi_personnelle:.0f}%")
 
             # Calcul du taux effectif avec TMI
             taux_effectif_tmi = calculer_taux_imposition_effectif(
@@ -347,126 +676,58 @@ def interets_composes_render():
     r = taux_annuel / 100
     t = duree_annees
 
-    def calculer_interet_compose_avance(P, PMT, r, n, m, t, debut_periode=False):
-        """
-        Calcul des intérêts composés avec fréquences différentes pour capitalisation et versements
-
-        P : capital initial
-        PMT : montant du versement périodique
-        r : taux annuel (ex: 0.05 pour 5%)
-        n : fréquence de capitalisation (nombre de périodes d'intérêt par an)
-        m : fréquence des versements (nombre de versements par an)
-        t : durée en années
-        debut_periode : True si versements en début de période, False si fin de période
-        """
-
-        # Cas spécial : capitalisation continue
-        if n == float("inf"):
-            # Valeur future du capital initial avec capitalisation continue
-            FV_capital = P * np.exp(r * t)
-
-            # Pour les versements avec capitalisation continue
-            if PMT > 0 and r > 0:
-                # Facteur d'ajustement pour versements en début vs fin de période
-                facteur_moment = np.exp(r / m) if debut_periode else 1
-
-                # Somme des versements avec capitalisation continue
-                FV_versements = 0
-                for k in range(int(m * t)):
-                    temps_depuis_versement = t - k / m
-                    if debut_periode:
-                        temps_depuis_versement -= 1 / m
-                    FV_versements += (
-                        PMT * facteur_moment * np.exp(r * temps_depuis_versement)
-                    )
-            elif PMT > 0:
-                FV_versements = PMT * m * t
-            else:
-                FV_versements = 0
-
-            return FV_capital + FV_versements
-
-        # Cas normal : capitalisation discrète
-        # Valeur future du capital initial
-        FV_capital = P * (1 + r / n) ** (n * t)
-
-        # Valeur future des versements
-        if PMT > 0 and r > 0:
-            # Facteur d'ajustement pour versements en début vs fin de période
-            facteur_moment = (1 + r / n) ** (n / m) if debut_periode else 1
-
-            FV_versements = 0
-            total_versements = int(m * t)
-
-            for k in range(total_versements):
-                # Temps restant après le k-ième versement (en années)
-                temps_restant = t - (k + 1) / m
-                if debut_periode:
-                    temps_restant += 1 / m
-
-                # Capitalisation du versement jusqu'à la fin
-                if temps_restant >= 0:
-                    FV_versements += (
-                        PMT * facteur_moment * (1 + r / n) ** (n * temps_restant)
-                    )
-        elif PMT > 0:
-            FV_versements = PMT * m * t
-        else:
-            FV_versements = 0
-
-        return FV_capital + FV_versements
-
-    def calc_van_versements_avance(P, PMT, i, m, t, debut_periode=False):
-        """Calcul de la valeur actuelle nette des versements"""
-        van = P  # Capital initial à t=0
-
-        facteur_moment = (1 + i) ** (1 / m) if debut_periode else 1
-
-        total_versements = int(m * t)
-        for k in range(total_versements):
-            temps_versement = (k + 1) / m
-            if debut_periode:
-                temps_versement -= 1 / m
-            van += PMT * facteur_moment / ((1 + i) ** temps_versement)
-        return van
-
     # Calculs avec les nouvelles options
     debut_periode = moment_versement == "Début de période"
 
-    valeur_finale_brute = calculer_interet_compose_avance(
-        capital_initial, versement_periodique, r, n, m, t, debut_periode
+    def fiscalite_par_annee(annees):
+        """Taux d'imposition (%) et abattement (€) pour chaque ancienneté"""
+        if not calcul_apres_impot:
+            return np.zeros(annees.shape), np.zeros(annees.shape)
+        taux = calculer_taux_imposition_effectif(
+            type_placement,
+            annees,
+            type_revenus_utilise,
+            tmi_personnelle if optimisation_fiscale else None,
+            optimisation_fiscale,
+        )
+        # Abattement de 4 600€ pour une personne seule en assurance-vie après 8 ans
+        abattements = np.where(
+            (type_placement == "Assurance-vie") & (annees >= 8), 4600, 0
+        )
+        return np.broadcast_to(taux, annees.shape), abattements
+
+    annees = np.arange(int(duree_annees) + 1)
+    taux_annees, abattements = fiscalite_par_annee(annees)
+
+    serie = calculer_serie_annuelle(
+        capital_initial,
+        versement_periodique,
+        r,
+        n,
+        m,
+        t,
+        debut_periode,
+        taux_annees,
+        abattements,
+        taux_inflation / 100,
     )
-    total_verse = capital_initial + (versement_periodique * m * t)
+
+    valeur_finale_brute = serie["Valeur brute"][-1]
+    total_verse = serie["Versements cumulés"][-1]
     interets_bruts = valeur_finale_brute - total_verse
 
-    van_versements = calc_van_versements_avance(
-        capital_initial, versement_periodique, taux_inflation / 100, m, t, debut_periode
-    )
+    van_versements = serie["Versements actualisés"][-1]
 
     # Application de l'impôt sur les intérêts uniquement
-    if calcul_apres_impot and interets_bruts > 0:
-        # Calcul des abattements selon le type de placement
-        abattement_applique = 0
-        if type_placement == "Assurance-vie" and duree_annees >= 8:
-            # Abattement de 4 600€ pour une personne seule
-            abattement_applique = 4600
-            interets_imposables = max(0, interets_bruts - abattement_applique)
-        else:
-            interets_imposables = interets_bruts
-
-        impots_sur_interets = interets_imposables * (taux_imposition / 100)
-        valeur_finale_nette = total_verse + (interets_bruts - impots_sur_interets)
-        interets_nets = interets_bruts - impots_sur_interets
-    else:
-        valeur_finale_nette = valeur_finale_brute
-        interets_nets = interets_bruts
-        impots_sur_interets = 0
-        abattement_applique = 0
-        interets_imposables = interets_bruts
+    valeur_finale_nette = serie["Valeur nette"][-1]
+    impots_sur_interets = serie["Impôts"][-1]
+    interets_imposables = serie["Intérêts imposables"][-1]
+    interets_nets = interets_bruts - impots_sur_interets
+    abattement_applique = abattements[-1]
 
     # Ajustement inflation (sur la valeur finale)
     if ajuster_inflation:
-        pouvoir_achat_final = valeur_finale_nette / ((1 + taux_inflation / 100) ** t)
+        pouvoir_achat_final = serie["Valeur réelle"][-1]
         perte_pouvoir_achat = valeur_finale_nette - pouvoir_achat_final
 
         rendement_reel_annuel = (
@@ -597,6 +858,210 @@ def interets_composes_render():
                 delta_color=couleur_gain,
             )
 
+    # Objectif de capital : versement, taux ou durée nécessaires
+    if st.checkbox("🎯 Atteindre un objectif de capital", key="ic_objectif"):
+        st.subheader("Que faut-il pour atteindre mon objectif ?")
+
+        mesures_objectif = {"Valeur brute": "Valeur brute"}
+        if calcul_apres_impot:
+            mesures_objectif["Valeur nette (après impôt)"] = "Valeur nette"
+        if ajuster_inflation:
+            mesures_objectif["Valeur réelle (après inflation)"] = "Valeur réelle"
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            cible = st.number_input(
+                "Capital visé (€)",
+                min_value=0.0,
+                value=float(round(valeur_finale_brute * 1.5, -3)),
+                step=1000.0,
+                format="%.0f",
+                key="ic_cible",
+            )
+        with col2:
+            mesure_objectif = st.selectbox(
+                "Valeur à atteindre",
+                list(mesures_objectif),
+                index=len(mesures_objectif) - 1,
+                key="ic_mesure_objectif",
+            )
+        with col3:
+            inconnue = st.radio(
+                "Paramètre à ajuster",
+                ["Versement périodique", "Taux annuel", "Durée"],
+                key="ic_inconnue",
+            )
+
+        parametres_objectif = dict(
+            P=capital_initial,
+            PMT=versement_periodique,
+            r=r,
+            n=n,
+            m=m,
+            t=t,
+            debut_periode=debut_periode,
+            taux_imposition=taux_annees[-1],
+            abattement=abattements[-1],
+            taux_inflation=taux_inflation / 100,
+        )
+        mesure = mesures_objectif[mesure_objectif]
+
+        if inconnue == "Versement périodique":
+            versement_requis = resoudre_objectif(
+                cible, "PMT", mesure, **parametres_objectif
+            )
+            if versement_requis is None:
+                st.warning("⚠️ Objectif hors d'atteinte avec ces paramètres.")
+            else:
+                st.metric(
+                    f"💶 Versement {affichage_frequence} nécessaire",
+                    f"{versement_requis:,.2f} €",
+                    f"{versement_requis - versement_periodique:+,.2f} € vs actuel",
+                )
+        elif inconnue == "Taux annuel":
+            taux_requis = resoudre_objectif(cible, "r", mesure, **parametres_objectif)
+            if taux_requis is None:
+                st.warning("⚠️ Objectif hors d'atteinte, même à 100 % par an.")
+            else:
+                st.metric(
+                    "📈 Rendement annuel nécessaire",
+                    f"{taux_requis * 100:.2f} %",
+                    f"{(taux_requis - r) * 100:+.2f} pts vs actuel",
+                )
+        else:
+            duree_max = 100
+            taux_duree, abattements_duree = fiscalite_par_annee(
+                np.arange(duree_max + 1)
+            )
+            parametres_objectif.update(
+                taux_imposition=taux_duree, abattement=abattements_duree
+            )
+            duree_requise = resoudre_objectif(
+                cible, "t", mesure, duree_max, **parametres_objectif
+            )
+            if duree_requise is None:
+                st.warning(f"⚠️ Objectif non atteint en {duree_max} ans.")
+            else:
+                st.metric(
+                    "⏳ Durée nécessaire",
+                    f"{duree_requise} ans",
+                    f"{duree_requise - duree_annees:+d} ans vs actuel",
+                )
+
+    # Analyse de sensibilité : quelle hypothèse pèse le plus ?
+    if st.checkbox("🌪️ Analyse de sensibilité des hypothèses", key="ic_sensibilite"):
+        st.subheader("Sensibilité de la valeur finale aux hypothèses")
+
+        variation = (
+            st.slider(
+                "Variation appliquée à chaque hypothèse (±%)",
+                min_value=5,
+                max_value=50,
+                value=20,
+                step=5,
+                key="ic_variation",
+            )
+            / 100
+        )
+
+        if ajuster_inflation:
+            mesure_sensibilite = "Valeur réelle"
+        elif calcul_apres_impot:
+            mesure_sensibilite = "Valeur nette"
+        else:
+            mesure_sensibilite = "Valeur brute"
+
+        parametres_reference = dict(
+            P=capital_initial,
+            PMT=versement_periodique,
+            r=r,
+            n=n,
+            m=m,
+            t=t,
+            debut_periode=debut_periode,
+            taux_imposition=taux_annees[-1],
+            abattement=abattements[-1],
+            taux_inflation=taux_inflation / 100,
+        )
+
+        # Une durée différente change aussi la fiscalité applicable
+        durees_variees = np.array(
+            [max(1, round(t * (1 - variation))), max(t + 1, round(t * (1 + variation)))]
+        )
+        taux_durees, abattements_durees = fiscalite_par_annee(durees_variees)
+
+        scenarios = {
+            "Taux annuel": ({"r": r * (1 - variation)}, {"r": r * (1 + variation)}),
+            "Versement périodique": (
+                {"PMT": versement_periodique * (1 - variation)},
+                {"PMT": versement_periodique * (1 + variation)},
+            ),
+            "Capital initial": (
+                {"P": capital_initial * (1 - variation)},
+                {"P": capital_initial * (1 + variation)},
+            ),
+            "Durée": tuple(
+                {"t": duree, "taux_imposition": taux, "abattement": abattement}
+                for duree, taux, abattement in zip(
+                    durees_variees, taux_durees, abattements_durees
+                )
+            ),
+        }
+        if ajuster_inflation:
+            scenarios["Inflation"] = (
+                {"taux_inflation": taux_inflation / 100 * (1 + variation)},
+                {"taux_inflation": taux_inflation / 100 * (1 - variation)},
+            )
+        if calcul_apres_impot:
+            scenarios["Fiscalité"] = (
+                {"taux_imposition": min(100.0, taux_annees[-1] * (1 + variation))},
+                {"taux_imposition": taux_annees[-1] * (1 - variation)},
+            )
+
+        valeur_reference, sensibilites = analyse_sensibilite(
+            parametres_reference, scenarios, mesure_sensibilite
+        )
+
+        # Hypothèses triées par amplitude, la plus influente en haut
+        libelles = sorted(
+            sensibilites, key=lambda libelle: np.ptp(sensibilites[libelle])
+        )
+        basses = np.array([sensibilites[libelle][0] for libelle in libelles])
+        hautes = np.array([sensibilites[libelle][1] for libelle in libelles])
+
+        fig_tornado = go.Figure()
+        fig_tornado.add_trace(
+            go.Bar(
+                y=libelles,
+                x=basses - valeur_reference,
+                base=valeur_reference,
+                orientation="h",
+                name="Hypothèse défavorable",
+                marker_color="#d62728",
+            )
+        )
+        fig_tornado.add_trace(
+            go.Bar(
+                y=libelles,
+                x=hautes - valeur_reference,
+                base=valeur_reference,
+                orientation="h",
+                name="Hypothèse favorable",
+                marker_color="#2ca02c",
+            )
+        )
+        fig_tornado.add_vline(
+            x=valeur_reference,
+            line_dash="dash",
+            annotation_text=f"Référence : {valeur_reference:,.0f} €",
+        )
+        fig_tornado.update_layout(
+            title=f"{mesure_sensibilite} selon chaque hypothèse (±{variation:.0%})",
+            barmode="overlay",
+            xaxis_title="Montant (€)",
+        )
+        st.plotly_chart(fig_tornado, use_container_width=True)
+
     # Comparaison des fréquences de capitalisation
     if st.checkbox("📊 Comparer les fréquences de capitalisation", key="compare_freq"):
         st.subheader("Impact de la fréquence de capitalisation")
@@ -609,32 +1074,30 @@ def interets_composes_render():
             "Continue": float("inf"),
         }
 
-        comparison_results = []
-        for freq_name, freq_value in freq_comparison.items():
-            valeur_comp = calculer_interet_compose_avance(
-                capital_initial,
-                versement_periodique,
-                r,
-                freq_value,
-                m,
-                t,
-                debut_periode,
-            )
-            interets_comp = valeur_comp - total_verse
-            comparison_results.append(
-                {
-                    "Fréquence": freq_name,
-                    "Valeur finale": valeur_comp,
-                    "Intérêts": interets_comp,
-                    "Gain vs Annuelle": (
-                        interets_comp - comparison_results[0]["Intérêts"]
-                        if comparison_results
-                        else 0
-                    ),
-                }
-            )
+        comparaison = comparer_frequences(
+            capital_initial,
+            versement_periodique * m,
+            r,
+            t,
+            list(freq_comparison.values()),
+            list(freq_versement_map.values()),
+            [True, False],
+        )
 
-        df_comparison = pd.DataFrame(comparison_results)
+        # Tranche correspondant aux versements choisis par l'utilisateur
+        indice_versement = list(freq_versement_map.values()).index(m)
+        indice_moment = 0 if debut_periode else 1
+        valeurs_comp = comparaison["Valeur finale"][:, indice_versement, indice_moment]
+        interets_comp = comparaison["Intérêts"][:, indice_versement, indice_moment]
+
+        df_comparison = pd.DataFrame(
+            {
+                "Fréquence": list(freq_comparison),
+                "Valeur finale": valeurs_comp,
+                "Intérêts": interets_comp,
+                "Gain vs Annuelle": interets_comp - interets_comp[0],
+            }
+        )
 
         col1, col2 = st.columns(2)
         with col1:
@@ -658,6 +1121,25 @@ def interets_composes_render():
             )
             st.plotly_chart(fig_comp, use_container_width=True)
 
+        # Matrice complète : capitalisation × fréquence et moment des versements
+        st.markdown(
+            f"**Valeur finale selon toutes les combinaisons** "
+            f"(effort d'épargne constant de {versement_periodique * m:,.0f} € par an)"
+        )
+        colonnes_matrice = pd.MultiIndex.from_product(
+            [list(freq_versement_map), ["Début de période", "Fin de période"]],
+            names=["Versements", "Moment"],
+        )
+        df_matrice = pd.DataFrame(
+            comparaison["Valeur finale"].reshape(len(freq_comparison), -1),
+            index=pd.Index(list(freq_comparison), name="Capitalisation"),
+            columns=colonnes_matrice,
+        )
+        st.dataframe(
+            df_matrice.style.format("{:,.2f} €"),
+            use_container_width=True,
+        )
+
     # Informations détaillées selon les options
     if calcul_apres_impot or ajuster_inflation:
         st.subheader("📊 Détail des calculs")
@@ -677,7 +1159,7 @@ def interets_composes_render():
                 if optimisation_fiscale:
                     info_revenus = f"- Type de revenus : {type_revenus_utilise}\n"
                     if "tmi_personnelle" in locals():
-                        info_revenus += f"- Votre TMI : {tmi_personnelle}%\n"
+                        info_revenus += f"- Votre TMI : {tmi_personnelle:.0f}%\n"
 
                 st.info(
                     f"""### 💼 Fiscalité {type_placement}
@@ -709,55 +1191,10 @@ def interets_composes_render():
                 )
 
     # Graphique évolution avec options
-    annees = list(range(0, int(duree_annees) + 1))
-    valeurs_brutes = []
-    valeurs_nettes = []
-    valeurs_reelles = []
-    versements_cumules = []
-
-    for annee in annees:
-        # Valeur brute
-        valeur_brute = calculer_interet_compose_avance(
-            capital_initial, versement_periodique, r, n, m, annee, debut_periode
-        )
-        valeurs_brutes.append(valeur_brute)
-
-        # Versements cumulés
-        verse_cumule = capital_initial + (versement_periodique * m * annee)
-        versements_cumules.append(verse_cumule)
-
-        # Valeur nette (après impôt)
-        if calcul_apres_impot and annee > 0:
-            interets_annee = valeur_brute - verse_cumule
-            if type_placement == "Assurance-vie" and annee >= 8:
-                interets_imposables_annee = max(0, interets_annee - 4600)
-            else:
-                interets_imposables_annee = interets_annee
-
-            # Adaptation du taux d'imposition selon l'ancienneté
-            if type_placement == "PEA" and annee >= 5:
-                taux_annee = 12.8
-            elif type_placement == "Assurance-vie" and annee >= 8:
-                taux_annee = 7.5 + 12.8
-            elif type_placement == "Assurance-vie":
-                taux_annee = 30
-            else:
-                taux_annee = taux_imposition
-
-            impots_annee = interets_imposables_annee * (taux_annee / 100)
-            valeur_nette = verse_cumule + (interets_annee - impots_annee)
-        else:
-            valeur_nette = valeur_brute
-
-        valeurs_nettes.append(valeur_nette)
-
-        # Valeur réelle (ajustée inflation)
-        if ajuster_inflation and annee > 0:
-            valeur_reelle = valeur_nette / ((1 + taux_inflation / 100) ** annee)
-        else:
-            valeur_reelle = valeur_nette
-
-        valeurs_reelles.append(valeur_reelle)
+    valeurs_brutes = serie["Valeur brute"]
+    valeurs_nettes = serie["Valeur nette"]
+    valeurs_reelles = serie["Valeur réelle"]
+    versements_cumules = serie["Versements cumulés"]
 
     fig = go.Figure()
 
@@ -830,3 +1267,189 @@ def interets_composes_render():
         hovermode="x unified",
     )
     st.plotly_chart(fig, use_container_width=True)
+
+    # Simulation Monte Carlo des rendements
+    if st.checkbox("🎲 Simulation Monte Carlo des rendements", key="ic_monte_carlo"):
+        st.subheader("Rendements aléatoires : fourchette de résultats")
+
+        source_rendements = st.radio(
+            "Source des rendements",
+            [
+                "Loi log-normale",
+                "Historique : bootstrap par blocs",
+                "Historique : toutes les périodes passées",
+            ],
+            horizontal=True,
+            key="ic_source_rendements",
+            help=(
+                "Les modes historiques utilisent un fichier local de rendements mensuels "
+                "(CSV ou Parquet, colonne « rendement »)."
+            ),
+        )
+
+        rendements_historiques = None
+        if source_rendements != "Loi log-normale":
+            fichier_historique = st.selectbox(
+                "Fichier de rendements mensuels",
+                lister_fichiers_rendements(),
+                key="ic_fichier_historique",
+                help="Fichiers CSV ou Parquet placés dans le dossier data/.",
+            )
+            if fichier_historique is None:
+                st.warning(
+                    "⚠️ Aucun fichier de rendements (CSV ou Parquet) dans le dossier data/."
+                )
+            else:
+                try:
+                    rendements_historiques = charger_rendements_historiques(
+                        fichier_historique
+                    )
+                except (OSError, ValueError, ImportError) as erreur:
+                    st.warning(f"⚠️ Impossible de lire {fichier_historique} : {erreur}")
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            volatilite = st.number_input(
+                "Volatilité annuelle (%)",
+                min_value=0.0,
+                max_value=60.0,
+                value=15.0,
+                step=1.0,
+                key="ic_volatilite",
+                disabled=source_rendements != "Loi log-normale",
+                help="Écart-type annuel des rendements (≈ 15 % pour un ETF actions monde).",
+            )
+            taille_bloc = st.number_input(
+                "Taille des blocs (mois)",
+                min_value=1,
+                max_value=120,
+                value=12,
+                step=1,
+                key="ic_taille_bloc",
+                disabled=source_rendements != "Historique : bootstrap par blocs",
+                help="Longueur des séquences historiques tirées d'un seul tenant.",
+            )
+        with col2:
+            n_chemins = st.select_slider(
+                "Nombre de simulations",
+                options=[1_000, 5_000, 10_000, 50_000, 100_000],
+                value=10_000,
+                key="ic_n_chemins",
+            )
+        with col3:
+            graine = st.number_input(
+                "Graine aléatoire",
+                min_value=0,
+                value=42,
+                step=1,
+                key="ic_graine",
+                help="Une même graine donne toujours les mêmes simulations.",
+            )
+
+        valeurs_simulees = None
+        if source_rendements == "Loi log-normale":
+            valeurs_simulees = simuler_monte_carlo(
+                capital_initial,
+                versement_periodique,
+                m,
+                t,
+                r,
+                volatilite / 100,
+                n_chemins,
+                debut_periode,
+                int(graine),
+            )
+        elif rendements_historiques is None:
+            pass  # Fichier introuvable, déjà signalé
+        elif rendements_historiques.size < 12 * t:
+            st.warning(
+                f"⚠️ L'historique ne couvre que {rendements_historiques.size} mois, "
+                f"moins que la durée du placement ({12 * t} mois)."
+            )
+        elif source_rendements == "Historique : bootstrap par blocs":
+            valeurs_simulees = simuler_monte_carlo(
+                capital_initial,
+                versement_periodique,
+                m,
+                t,
+                r,
+                0.0,
+                n_chemins,
+                debut_periode,
+                int(graine),
+                rendements_historiques,
+                int(taille_bloc),
+            )
+        else:
+            valeurs_simulees = backtest_historique(
+                rendements_historiques,
+                capital_initial,
+                versement_periodique,
+                m,
+                t,
+                debut_periode,
+            )
+            st.caption(f"{len(valeurs_simulees)} dates de départ historiques évaluées.")
+
+        if valeurs_simulees is not None:
+            bandes = bandes_percentiles(valeurs_simulees)
+            valeurs_finales = valeurs_simulees[:, -1]
+
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("🎯 Valeur médiane", f"{bandes[50][-1]:,.2f} €")
+            with col2:
+                st.metric("📉 Scénario défavorable (5 %)", f"{bandes[5][-1]:,.2f} €")
+            with col3:
+                st.metric("📈 Scénario favorable (95 %)", f"{bandes[95][-1]:,.2f} €")
+            with col4:
+                st.metric(
+                    "✅ Probabilité de gain",
+                    f"{(valeurs_finales > total_verse).mean():.1%}",
+                    help="Part des simulations dont la valeur finale dépasse le total versé.",
+                )
+
+            fig_mc = go.Figure()
+            for bas, haut, opacite in ((5, 95, 0.15), (25, 75, 0.3)):
+                fig_mc.add_trace(
+                    go.Scatter(
+                        x=annees,
+                        y=bandes[haut],
+                        line=dict(width=0),
+                        showlegend=False,
+                        hoverinfo="skip",
+                    )
+                )
+                fig_mc.add_trace(
+                    go.Scatter(
+                        x=annees,
+                        y=bandes[bas],
+                        fill="tonexty",
+                        fillcolor=f"rgba(255, 127, 14, {opacite})",
+                        line=dict(width=0),
+                        name=f"{bas}e – {haut}e percentile",
+                    )
+                )
+            fig_mc.add_trace(
+                go.Scatter(
+                    x=annees,
+                    y=bandes[50],
+                    name="Médiane",
+                    line=dict(color="#ff7f0e"),
+                )
+            )
+            fig_mc.add_trace(
+                go.Scatter(
+                    x=annees,
+                    y=versements_cumules,
+                    name="Versements cumulés",
+                    line=dict(color="#1f77b4", dash="dot"),
+                )
+            )
+            fig_mc.update_layout(
+                title=f"Évolution du capital sur {len(valeurs_simulees)} trajectoires",
+                xaxis_title="Années",
+                yaxis_title="Montant (€)",
+                hovermode="x unified",
+            )
+            st.plotly_chart(fig_mc, use_container_width=True)
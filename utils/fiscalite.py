@@ -0,0 +1,354 @@
+import json
+
+import numpy as np
+import streamlit as st
+
+# Registre versionné des barèmes : ajouter une année = ajouter une entrée au fichier
+CHEMIN_BAREMES = "data/baremes_impot.json"
+
+
+def _lecture_seule(tableau):
+    """Tableau partagé entre sessions : toute modification accidentelle échoue"""
+    tableau.flags.writeable = False
+    return tableau
+
+
+@st.cache_resource
+def charger_baremes(chemin=CHEMIN_BAREMES):
+    """
+    Registre des barèmes de l'impôt sur le revenu, lu une seule fois par processus
+
+    chemin : fichier JSON {année: {"tranches": [[borne basse, taux %], ...],
+    "abattement": {"taux", "plafond"}, "decote": {"seuil", "taux"},
+    "quotient_familial": {"plafond_demi_part"},
+    "per": {"taux", "plafond_minimum", "plafond_maximum"}}}
+
+    Chaque année est convertie en tableaux précalculés : bornes basses des tranches,
+    taux en % et impôt par part déjà dû au niveau de chaque borne.
+    """
+    with open(chemin, encoding="utf-8") as f:
+        baremes = json.load(f)
+
+    registre = {}
+    for annee, parametres in baremes.items():
+        bornes, taux = np.asarray(parametres["tranches"], dtype=float).T
+        impot_cumule = np.concatenate(
+            ([0.0], np.cumsum(np.diff(bornes) * taux[:-1] / 100))
+        )
+        registre[int(annee)] = {
+            "bornes": _lecture_seule(bornes),
+            "taux": _lecture_seule(taux),
+            "impot_cumule": _lecture_seule(impot_cumule),
+            "taux_abattement": float(parametres["abattement"]["taux"]),
+            "plafond_abattement": float(parametres["abattement"]["plafond"]),
+            "seuil_decote": float(parametres["decote"]["seuil"]),
+            "taux_decote": float(parametres["decote"]["taux"]),
+            "plafond_demi_part": float(
+                parametres["quotient_familial"]["plafond_demi_part"]
+            ),
+            "taux_per": float(parametres["per"]["taux"]),
+            "plafond_per_minimum": float(parametres["per"]["plafond_minimum"]),
+            "plafond_per_maximum": float(parametres["per"]["plafond_maximum"]),
+        }
+    return registre
+
+
+def annees_fiscales():
+    """Années disponibles dans le registre, de la plus récente à la plus ancienne"""
+    return sorted(charger_baremes(), reverse=True)
+
+
+def bareme_impot(annee=None):
+    """
+    Paramètres précalculés d'une année fiscale (None = année la plus récente)
+
+    Renvoie le dict du registre : "bornes", "taux", "impot_cumule",
+    "taux_abattement", "plafond_abattement", "seuil_decote", "taux_decote",
+    "plafond_demi_part", "taux_per", "plafond_per_minimum", "plafond_per_maximum".
+    """
+    registre = charger_baremes()
+    return registre[max(registre) if annee is None else annee]
+
+
+def _impot_par_part(quotient, parametres):
+    """Impôt par part et indice de tranche, par recherche dans les bornes"""
+    bornes, taux = parametres["bornes"], parametres["taux"]
+    tranche = np.maximum(np.searchsorted(bornes, quotient, side="right") - 1, 0)
+    impot = parametres["impot_cumule"][tranche] + (quotient - bornes[tranche]) * (
+        taux[tranche] / 100
+    )
+    return np.maximum(impot, 0), tranche
+
+
+def calculer_impot_revenu(
+    revenus_bruts, nb_parts=1, annee=None, parts_de_base=None, deductions=0.0
+):
+    """
+    Impôt sur le revenu pour des tableaux de foyers (vectorisé)
+
+    revenus_bruts : revenus annuels avant abattement de 10 % (scalaire ou tableau)
+    nb_parts : nombre de parts fiscales (scalaire ou tableau diffusable)
+    annee : année fiscale du registre (None = la plus récente)
+    parts_de_base : parts hors enfants (1 seul, 2 en couple) ; si renseigné,
+    l'avantage des demi-parts supplémentaires est plafonné
+    deductions : charges déductibles du revenu imposable, ex: versements PER
+
+    Abattement de 10 % plafonné, quotient familial, tranche trouvée par
+    np.searchsorted sur les bornes et impôt cumulé précalculé, plafonnement
+    du quotient familial puis décote.
+    Renvoie un dict : "Revenu imposable", "Quotient familial", "Impôt brut",
+    "Décote", "Impôt", "TMI" (%) et "Taux moyen" (% des revenus bruts).
+    """
+    parametres = bareme_impot(annee)
+    taux = parametres["taux"]
+    revenus_bruts = np.asarray(revenus_bruts, dtype=float)
+    nb_parts = np.asarray(nb_parts, dtype=float)
+
+    abattement = np.minimum(
+        parametres["taux_abattement"] * revenus_bruts,
+        parametres["plafond_abattement"],
+    )
+    revenu_imposable = np.maximum(revenus_bruts - abattement - deductions, 0)
+    quotient = revenu_imposable / nb_parts
+
+    impot_par_part, tranche = _impot_par_part(quotient, parametres)
+    impot_brut = impot_par_part * nb_parts
+
+    # Plafonnement du quotient familial : l'impôt calculé sans les demi-parts
+    # supplémentaires, diminué du plafond par demi-part, sert de plancher
+    if parts_de_base is not None:
+        parts_de_base = np.asarray(parts_de_base, dtype=float)
+        impot_base, tranche_base = _impot_par_part(
+            revenu_imposable / parts_de_base, parametres
+        )
+        plancher = impot_base * parts_de_base - parametres["plafond_demi_part"] * 2 * (
+            nb_parts - parts_de_base
+        )
+        plafonne = plancher > impot_brut
+        impot_brut = np.where(plafonne, plancher, impot_brut)
+        tranche = np.where(plafonne, tranche_base, tranche)
+
+    # Décote : seuil relevé au-delà de deux parts
+    seuil_decote = parametres["seuil_decote"] * np.maximum(nb_parts, 2) / 2
+    decote = np.where(
+        impot_brut < seuil_decote,
+        np.minimum(impot_brut, (seuil_decote - impot_brut) * parametres["taux_decote"]),
+        0.0,
+    )
+    impot = np.maximum(impot_brut - decote, 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taux_moyen = np.where(revenus_bruts > 0, impot / revenus_bruts * 100, 0.0)
+
+    resultat = {
+        "Revenu imposable": revenu_imposable,
+        "Quotient familial": quotient,
+        "Impôt brut": impot_brut,
+        "Décote": decote,
+        "Impôt": impot,
+        "TMI": taux[tranche],
+        "Taux moyen": taux_moyen,
+    }
+    return {cle: valeur[()] for cle, valeur in resultat.items()}
+
+
+def bases_par_tranche(quotient, annee=None):
+    """
+    Part du quotient familial imposée dans chaque tranche
+
+    Renvoie un tableau (..., nombre de tranches).
+    """
+    bornes = bareme_impot(annee)["bornes"]
+    largeurs = np.append(np.diff(bornes), np.inf)
+    return np.clip(np.asarray(quotient, dtype=float)[..., None] - bornes, 0, largeurs)
+
+
+def courbes_taux_impot(
+    revenus_bruts, nb_parts=1, annee=None, ecart=1.0, parts_de_base=None
+):
+    """
+    Taux marginal effectif, taux moyen et revenu net sur une grille de revenus
+
+    revenus_bruts : tableau de revenus annuels avant abattement
+    nb_parts : nombre de parts fiscales
+    annee : année fiscale
+    ecart : incrément de revenu (€) pour la dérivée numérique
+    parts_de_base : parts hors enfants, pour le plafonnement du quotient familial
+
+    Le taux marginal effectif est la variation de l'impôt pour `ecart` euro
+    supplémentaire : il inclut l'abattement de 10 % (et son plafond) ainsi que
+    la sortie progressive de la décote. Un seul appel au moteur pour toute la grille.
+    """
+    revenus_bruts = np.asarray(revenus_bruts, dtype=float)
+    impots = calculer_impot_revenu(
+        np.stack((revenus_bruts, revenus_bruts + ecart)),
+        nb_parts,
+        annee,
+        parts_de_base,
+    )["Impôt"]
+    impot = impots[0]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        taux_moyen = np.where(revenus_bruts > 0, impot / revenus_bruts * 100, 0.0)
+
+    return {
+        "Revenus bruts": revenus_bruts,
+        "Impôt": impot,
+        "Taux marginal effectif": (impots[1] - impot) / ecart * 100,
+        "Taux moyen": taux_moyen,
+        "Revenu net": revenus_bruts - impot,
+    }
+
+
+def parts_enfants(enfants_exclusifs, enfants_alternes):
+    """
+    Parts fiscales apportées par les enfants (vectorisé)
+
+    enfants_exclusifs : nombre d'enfants à charge exclusive ou principale
+    enfants_alternes : nombre d'enfants en résidence alternée
+
+    Demi-part pour chacun des deux premiers enfants, part entière à partir du
+    troisième ; les enfants à charge exclusive sont classés en premier et les
+    enfants en résidence alternée n'apportent que la moitié de leur majoration.
+    """
+
+    def majoration(n):
+        return 0.5 * np.minimum(n, 2) + np.maximum(n - 2, 0)
+
+    enfants_exclusifs = np.asarray(enfants_exclusifs)
+    total = enfants_exclusifs + np.asarray(enfants_alternes)
+    return (
+        majoration(enfants_exclusifs)
+        + (majoration(total) - majoration(enfants_exclusifs)) / 2
+    )
+
+
+def optimiser_declaration(
+    revenus_declarant_1,
+    revenus_declarant_2,
+    enfants_exclusifs=0,
+    enfants_alternes=0,
+    annee=None,
+):
+    """
+    Compare toutes les façons de déclarer un foyer de deux adultes
+
+    revenus_declarant_1, revenus_declarant_2 : revenus bruts annuels de chacun (€)
+    enfants_exclusifs, enfants_alternes : enfants du foyer selon leur mode de garde
+    annee : année fiscale du registre
+
+    Imposition commune (2 parts + enfants) et toutes les répartitions des enfants
+    entre deux déclarations séparées (1 part chacune + enfants rattachés), avec
+    plafonnement du quotient familial. Toutes les déclarations sont évaluées en un
+    seul appel au moteur. Renvoie un dict de tableaux (une ligne par configuration),
+    trié de la moins imposée à la plus imposée.
+    """
+    # Répartitions possibles : nombre d'enfants de chaque type rattachés au déclarant 1
+    exclusifs_1, alternes_1 = (
+        grille.ravel()
+        for grille in np.meshgrid(
+            np.arange(enfants_exclusifs + 1), np.arange(enfants_alternes + 1)
+        )
+    )
+    exclusifs_2 = enfants_exclusifs - exclusifs_1
+    alternes_2 = enfants_alternes - alternes_1
+    n_separees = exclusifs_1.size
+
+    # Déclarations : [commune, séparées déclarant 1..., séparées déclarant 2...]
+    revenus = np.concatenate(
+        (
+            [revenus_declarant_1 + revenus_declarant_2],
+            np.full(n_separees, revenus_declarant_1),
+            np.full(n_separees, revenus_declarant_2),
+        )
+    )
+    parts_de_base = np.concatenate(([2.0], np.ones(2 * n_separees)))
+    nb_parts = parts_de_base + parts_enfants(
+        np.concatenate(([enfants_exclusifs], exclusifs_1, exclusifs_2)),
+        np.concatenate(([enfants_alternes], alternes_1, alternes_2)),
+    )
+    impots = calculer_impot_revenu(revenus, nb_parts, annee, parts_de_base)["Impôt"]
+
+    impots_1 = np.concatenate(([impots[0]], impots[1 : n_separees + 1]))
+    impots_2 = np.concatenate(([0.0], impots[n_separees + 1 :]))
+    configurations = {
+        "Imposition": np.array(["Commune"] + ["Séparée"] * n_separees),
+        "Enfants déclarant 1": np.concatenate(
+            ([enfants_exclusifs + enfants_alternes], exclusifs_1 + alternes_1)
+        ),
+        "dont alternés déclarant 1": np.concatenate(([enfants_alternes], alternes_1)),
+        "Enfants déclarant 2": np.concatenate(([0], exclusifs_2 + alternes_2)),
+        "dont alternés déclarant 2": np.concatenate(([0], alternes_2)),
+        "Parts déclarant 1": np.concatenate(
+            ([nb_parts[0]], nb_parts[1 : n_separees + 1])
+        ),
+        "Parts déclarant 2": np.concatenate(([0.0], nb_parts[n_separees + 1 :])),
+        "Impôt déclarant 1": impots_1,
+        "Impôt déclarant 2": impots_2,
+        "Impôt total": impots_1 + impots_2,
+    }
+    ordre = np.argsort(configurations["Impôt total"], kind="stable")
+    return {cle: valeur[ordre] for cle, valeur in configurations.items()}
+
+
+def plafond_per(revenus_bruts, annee=None):
+    """
+    Plafond de déduction des versements PER de l'année (vectorisé)
+
+    10 % des revenus après abattement de 10 %, borné par le plancher et le
+    plafond du registre (10 % du PASS et 10 % de 8 PASS).
+    """
+    parametres = bareme_impot(annee)
+    revenus_bruts = np.asarray(revenus_bruts, dtype=float)
+    abattement = np.minimum(
+        parametres["taux_abattement"] * revenus_bruts,
+        parametres["plafond_abattement"],
+    )
+    return np.clip(
+        parametres["taux_per"] * (revenus_bruts - abattement),
+        parametres["plafond_per_minimum"],
+        parametres["plafond_per_maximum"],
+    )[()]
+
+
+def balayer_versements_per(
+    revenus_bruts,
+    nb_parts=1,
+    annee=None,
+    parts_de_base=None,
+    plafond=None,
+    pas=10.0,
+):
+    """
+    Économie d'impôt pour chaque versement PER de 0 € jusqu'au plafond
+
+    revenus_bruts : revenus annuels du foyer avant abattement (€)
+    nb_parts, annee, parts_de_base : comme pour calculer_impot_revenu
+    plafond : plafond de déduction (par défaut celui de l'année)
+    pas : écart entre deux versements évalués (€)
+
+    Tous les versements, et chacun augmenté d'un euro pour l'économie marginale,
+    sont évalués en un seul appel au moteur. Renvoie un dict de tableaux :
+    "Versement", "Impôt", "Économie", "Économie marginale" (% du dernier euro
+    versé) et "TMI" (%).
+    """
+    if plafond is None:
+        plafond = plafond_per(revenus_bruts, annee)
+    versements = np.append(np.arange(0, plafond, pas), plafond)
+
+    resultat = calculer_impot_revenu(
+        revenus_bruts,
+        nb_parts,
+        annee,
+        parts_de_base,
+        deductions=np.stack((versements, versements + 1)),
+    )
+    impots = resultat["Impôt"]
+
+    return {
+        "Versement": versements,
+        "Impôt": impots[0],
+        "Économie": impots[0, 0] - impots[0],
+        "Économie marginale": (impots[0] - impots[1]) * 100,
+        "TMI": resultat["TMI"][0],
+    }
@@ -0,0 +1,119 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Seuls les fichiers de ce dossier peuvent être chargés ; les caches vont à part
+DOSSIER_DONNEES = Path("data")
+DOSSIER_CACHE = DOSSIER_DONNEES / "cache"
+EXTENSIONS_RENDEMENTS = (".csv", ".parquet")
+
+
+def lister_fichiers_rendements():
+    """Fichiers de rendements (CSV ou Parquet) disponibles dans le dossier data/"""
+    if not DOSSIER_DONNEES.is_dir():
+        return []
+    return sorted(
+        chemin.name
+        for chemin in DOSSIER_DONNEES.iterdir()
+        if chemin.is_file() and chemin.suffix in EXTENSIONS_RENDEMENTS
+    )
+
+
+def charger_rendements_historiques(nom_fichier):
+    """
+    Charge un fichier local de rendements mensuels d'indice (CSV ou Parquet)
+
+    nom_fichier : nom d'un fichier du dossier data/ (voir lister_fichiers_rendements)
+    avec une colonne "rendement" (rendement mensuel simple, ex: 0.012 pour +1,2 %) ;
+    à défaut, la dernière colonne est utilisée.
+
+    Le fichier est converti une seule fois en log-rendements dans un .npy du
+    dossier data/cache/ (régénéré si la source est plus récente), puis ouvert en
+    lecture seule en mémoire mappée ; si le cache ne peut pas être écrit, les
+    rendements sont renvoyés en mémoire.
+    Lève OSError si le fichier est illisible et ValueError s'il ne contient
+    aucun rendement numérique (pandas.errors.ParserError en dérive).
+    """
+    chemin = DOSSIER_DONNEES / Path(nom_fichier).name
+    if chemin.suffix not in EXTENSIONS_RENDEMENTS:
+        raise ValueError(f"Format non pris en charge : {chemin.suffix}")
+    chemin_npy = DOSSIER_CACHE / f"{chemin.name}.npy"
+
+    if not chemin_npy.exists() or chemin_npy.stat().st_mtime < chemin.stat().st_mtime:
+        if chemin.suffix == ".parquet":
+            df = pd.read_parquet(chemin)
+        else:
+            df = pd.read_csv(chemin)
+        if df.empty:
+            raise ValueError(f"Fichier vide : {chemin.name}")
+        colonne = df["rendement"] if "rendement" in df else df.iloc[:, -1]
+        rendements = pd.to_numeric(colonne, errors="coerce").dropna().to_numpy()
+        if rendements.size == 0:
+            raise ValueError(f"Aucun rendement numérique dans {chemin.name}")
+        log_rendements = np.log1p(rendements)
+        try:
+            DOSSIER_CACHE.mkdir(parents=True, exist_ok=True)
+            np.save(chemin_npy, log_rendements)
+        except OSError:
+            return log_rendements
+
+    return np.load(chemin_npy, mmap_mode="r")
+
+
+def fenetres_glissantes(log_rendements, n_periodes):
+    """
+    Toutes les fenêtres historiques de n_periodes consécutives, sans copie
+
+    Renvoie une vue (n_fenetres, n_periodes) : une ligne par date de départ.
+    """
+    return sliding_window_view(log_rendements, n_periodes)
+
+
+def bootstrap_par_blocs(
+    log_rendements,
+    n_chemins,
+    n_periodes,
+    taille_bloc=12,
+    graine=None,
+    taille_lot=5_000,
+):
+    """
+    Chemins de rendements rééchantillonnés par blocs de mois consécutifs
+
+    log_rendements : série historique de log-rendements mensuels
+    n_chemins : nombre total de chemins
+    n_periodes : nombre de mois par chemin
+    taille_bloc : longueur des blocs (préserve l'autocorrélation de court terme)
+    graine : graine du générateur
+    taille_lot : nombre de chemins produits à la fois
+
+    Produit, comme generer_log_rendements, des tableaux (taille du lot, n_periodes).
+    """
+    generateur = np.random.default_rng(graine)
+    log_rendements = np.asarray(log_rendements)
+    taille_bloc = min(taille_bloc, log_rendements.size)
+    n_blocs = -(-n_periodes // taille_bloc)
+    decalages = np.arange(taille_bloc)
+
+    for debut in range(0, n_chemins, taille_lot):
+        taille = min(taille_lot, n_chemins - debut)
+        departs = generateur.integers(
+            0, log_rendements.size - taille_bloc + 1, size=(taille, n_blocs)
+        )
+        indices = (departs[:, :, None] + decalages).reshape(taille, -1)
+        yield log_rendements[indices[:, :n_periodes]]
+
+
+def regrouper_periodes(log_rendements_mensuels, periodes_par_an):
+    """
+    Regroupe des log-rendements mensuels en périodes de 12 / periodes_par_an mois
+
+    log_rendements_mensuels : tableau (..., mois), mois multiple de 12 / periodes_par_an
+    """
+    mois_par_periode = 12 // int(periodes_par_an)
+    if mois_par_periode == 1:
+        return log_rendements_mensuels
+    forme = log_rendements_mensuels.shape[:-1] + (-1, mois_par_periode)
+    return log_rendements_mensuels.reshape(forme).sum(axis=-1)
@@ -0,0 +1,68 @@
+import numpy as np
+
+
+def generer_log_rendements(
+    n_chemins,
+    n_periodes,
+    rendement_moyen,
+    volatilite,
+    periodes_par_an=12,
+    graine=None,
+    taille_lot=5_000,
+):
+    """
+    Génère des log-rendements aléatoires par lots de chemins (mémoire bornée)
+
+    n_chemins : nombre total de chemins simulés
+    n_periodes : nombre de périodes par chemin
+    rendement_moyen : rendement annuel moyen espéré (ex: 0.05 pour 5%)
+    volatilite : écart-type annuel des rendements (ex: 0.15 pour 15%)
+    periodes_par_an : nombre de périodes par an (12 = mensuel)
+    graine : graine du générateur, pour des résultats reproductibles
+    taille_lot : nombre de chemins générés à la fois
+
+    Rendements log-normaux dont l'espérance de croissance annuelle vaut rendement_moyen.
+    Produit des tableaux de forme (taille du lot, n_periodes).
+    """
+    generateur = np.random.default_rng(graine)
+    sigma = volatilite / np.sqrt(periodes_par_an)
+    mu = np.log1p(rendement_moyen) / periodes_par_an - sigma**2 / 2
+
+    for debut in range(0, n_chemins, taille_lot):
+        taille = min(taille_lot, n_chemins - debut)
+        yield generateur.normal(mu, sigma, size=(taille, n_periodes))
+
+
+def trajectoires_patrimoine(log_rendements, P, PMT, debut_periode=False):
+    """
+    Valeur du patrimoine à chaque période pour un lot de chemins de rendements
+
+    log_rendements : tableau (chemins, périodes) de log-rendements par période
+    P : capital initial
+    PMT : versement par période (scalaire ou tableau par période)
+    debut_periode : True si versements en début de période, False si fin de période
+
+    W_k = e^(L_k) * (P + Σ PMT_j e^(-L_j)), avec L la somme cumulée des log-rendements :
+    aucune boucle sur les périodes. Renvoie un tableau (chemins, périodes + 1), colonne 0 = P.
+    """
+    cumul = np.cumsum(log_rendements, axis=1)
+    cumul = np.concatenate((np.zeros((cumul.shape[0], 1)), cumul), axis=1)
+
+    # Un versement en début de période capitalise dès la période où il est fait
+    cumul_versement = cumul[:, :-1] if debut_periode else cumul[:, 1:]
+    versements_actualises = np.cumsum(PMT * np.exp(-cumul_versement), axis=1)
+    versements_actualises = np.concatenate(
+        (np.zeros((cumul.shape[0], 1)), versements_actualises), axis=1
+    )
+
+    return np.exp(cumul) * (P + versements_actualises)
+
+
+def bandes_percentiles(valeurs, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Percentiles par colonne d'un tableau (chemins, instants)
+
+    Renvoie un dict {percentile: tableau des valeurs à chaque instant}.
+    """
+    bandes = np.percentile(valeurs, percentiles, axis=0)
+    return dict(zip(percentiles, bandes))